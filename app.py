@@ -13,7 +13,7 @@ from flask import Flask, render_template, request, jsonify, session, redirect, u
 from utils.timezone import utc_now, utc_timestamp, format_for_display
 
 # Import our modular components
-from models.database import init_database, get_version_info, health_check
+from models.database import init_database, get_version_info, health_check, get_query_profile
 from models.users import (
     authenticate_user, create_session, get_user_by_session, 
     get_user_by_username, invalidate_session, log_query,
@@ -793,8 +793,19 @@ def api_admin_candidate_invitations():
     admin_user = session.get('admin_user', {})
     log_admin_action(admin_user.get('id'), 'view_candidate_invitations', 'Accessed candidate invitations list')
     
-    invitations = get_all_candidate_invitations()
-    return jsonify({'success': True, 'invitations': invitations})
+    # Keep pages bounded: SQLite reads a negative LIMIT as "no limit"
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    invitations = get_all_candidate_invitations(
+        limit=limit,
+        before_created_at=request.args.get('before_created_at'),
+        before_id=request.args.get('before_id', type=int)
+    )
+    
+    # A full page may have more after it; the client sends this back for the next one
+    next_cursor = None
+    if invitations and len(invitations) == limit:
+        next_cursor = {'before_created_at': invitations[-1]['created_at'], 'before_id': invitations[-1]['id']}
+    return jsonify({'success': True, 'invitations': invitations, 'next_cursor': next_cursor})
 
 
 @app.route('/api/admin/candidates/invitations', methods=['POST'])
@@ -1092,6 +1103,15 @@ def api_admin_reseed_challenges():
         return jsonify({'error': 'Failed to reseed challenges'}), 500
 
 
+@app.route('/api/admin/query-profile', methods=['GET'])
+@require_admin
+def api_admin_query_profile():
+    """Per-function timings recorded when SQL_PROFILE is enabled (Admin only)"""
+    admin_user = session.get('admin_user', {})
+    log_admin_action(admin_user.get('id'), 'api_query_profile', 'Viewed query profile')
+    return jsonify(get_query_profile())
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g, stream_with_context
 import sqlite3
 import json
 import hashlib
@@ -9,8 +9,14 @@ import time
 import zipfile
 import csv
 import io
+import itertools
+import functools
+from collections import defaultdict
 import tempfile
-from werkzeug.utils import secure_filename
+import queue
+import threading
+import atexit
+import logging
 
 # Get version info from build files or environment variables
 def get_version_info():
@@ -48,8 +54,17 @@ def get_version_info():
         'environment': os.getenv('FLASK_ENV', 'development')
     }
 
+@functools.lru_cache(maxsize=1)
+def get_cached_version_info():
+    """Version info can't change while the process runs, so read the build file once"""
+    return get_version_info()
+
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-in-production')
+app.start_time = time.time()  # Reported as uptime by /health
 
 # Use local path in development, container path in production
 if os.path.exists('/app/data'):
@@ -59,10 +74,40 @@ else:
     DATABASE = 'healthcare_quiz.db'
     USER_DATABASE = 'user_data.db'
 
+# Database files already switched to WAL (journal_mode is persistent, so once per file)
+_wal_databases = set()
+
+def configure_connection(conn, database):
+    """Apply read-heavy performance pragmas to a newly opened connection"""
+    if database not in _wal_databases:
+        try:
+            # WAL lets readers run concurrently with an upload in progress
+            conn.execute('PRAGMA journal_mode = WAL')
+            _wal_databases.add(database)
+        except sqlite3.OperationalError as e:
+            logger.warning("could not enable WAL for %s: %s", database, e)
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA mmap_size = 268435456')  # 256MB
+    conn.execute('PRAGMA cache_size = -131072')  # 128MB
+    return conn
+
 def get_db_connection():
     """Get connection to healthcare database (accessible via web UI)"""
     conn = sqlite3.connect(DATABASE)
     conn.row_factory = sqlite3.Row
+    return configure_connection(conn, DATABASE)
+
+def get_readonly_db_connection():
+    """Get a read-only connection to the healthcare database for running candidate SQL"""
+    # mode=ro opens the file without write access, so SQLite never takes a
+    # write lock or touches the journal; query_only also rejects writes that
+    # slip past validation
+    conn = sqlite3.connect(f'file:{DATABASE}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only = ON')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA mmap_size = 268435456')  # 256MB
     return conn
 
 def get_user_db_connection():
@@ -71,6 +116,73 @@ def get_user_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
+# Connections kept open between requests so threaded workers don't reconnect per request
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+_db_pools = {}
+_db_pools_lock = threading.Lock()
+
+def _get_pool(database):
+    """Get (or create) the connection pool for a database file"""
+    with _db_pools_lock:
+        pool = _db_pools.get(database)
+        if pool is None:
+            pool = _db_pools[database] = queue.Queue(maxsize=DB_POOL_SIZE)
+        return pool
+
+def checkout_connection(database):
+    """Take a connection from the pool, opening a new one if none are idle"""
+    try:
+        return _get_pool(database).get_nowait()
+    except queue.Empty:
+        # A larger statement cache keeps every endpoint's SQL prepared on long-lived connections
+        conn = sqlite3.connect(database, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        return configure_connection(conn, database)
+
+def checkin_connection(database, conn):
+    """Return a connection to the pool, closing it if the pool is already full"""
+    try:
+        conn.rollback()  # Never hand an open transaction to the next request
+        _get_pool(database).put_nowait(conn)
+    except (queue.Full, sqlite3.Error):
+        conn.close()
+
+def get_request_db(database=None):
+    """Get the pooled connection to a database (healthcare by default) for the current request"""
+    database = database or DATABASE
+    pooled = g.setdefault('pooled_connections', {})
+    conn = pooled.get(database)
+    if conn is None:
+        conn = pooled[database] = checkout_connection(database)
+    return conn
+
+def get_request_user_db():
+    """Get the pooled user tracking database connection for the current request"""
+    return get_request_db(USER_DATABASE)
+
+@app.teardown_appcontext
+def release_request_db(exception=None):
+    """Return the request's pooled connections once the request is finished"""
+    for database, conn in g.pop('pooled_connections', {}).items():
+        checkin_connection(database, conn)
+
+@atexit.register
+def close_pooled_connections():
+    """Close idle pooled connections when the worker exits"""
+    for pool in list(_db_pools.values()):
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+def rows_as_dicts(cursor):
+    """Convert a cursor's rows to dicts, looking the column names up only once"""
+    # dict(sqlite3.Row) resolves every key by name per row; zipping the
+    # description's names with the plain values avoids that
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
 def init_database():
     """Initialize both healthcare and user databases"""
     print("Initializing databases...")
@@ -126,6 +238,11 @@ def init_healthcare_database():
                 load_healthcare_data(conn)
             else:
                 print("CSV files not found - creating empty healthcare tables")
+            
+            # Indexes are built after the load rather than maintained per insert
+            if os.path.exists('schema_indexes.sql'):
+                with open('schema_indexes.sql', 'r') as f:
+                    conn.executescript(f.read())
         
         conn.commit()
         print(f"Healthcare database initialized successfully: {DATABASE}")
@@ -245,6 +362,38 @@ def create_user_tables(conn):
         )
     ''')
     
+    # Indexes for per-candidate and per-challenge aggregation in the admin views
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ca_user_chal
+        ON challenge_attempts (user_id, challenge_id, is_correct)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ca_chal
+        ON challenge_attempts (challenge_id, is_correct)
+    ''')
+    
+    # Each candidate's latest attempt time is kept on the users row (maintained
+    # by a trigger) so the admin candidate list can be read in index order
+    user_columns = {row['name'] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'last_activity' not in user_columns:
+        conn.execute('ALTER TABLE users ADD COLUMN last_activity TIMESTAMP')
+        conn.execute('''
+            UPDATE users SET last_activity = (
+                SELECT MAX(created_at) FROM challenge_attempts WHERE user_id = users.id
+            )
+        ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_users_last_activity
+        ON users (last_activity DESC)
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_ca_user_last_activity
+        AFTER INSERT ON challenge_attempts
+        BEGIN
+            UPDATE users SET last_activity = NEW.created_at WHERE id = NEW.user_id;
+        END
+    ''')
+    
     # Create user challenge progress table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS user_challenge_progress (
@@ -372,6 +521,27 @@ def seed_healthcare_challenges():
     finally:
         conn.close()
 
+# Characters stripped from uploaded column names (bullets, control characters, UTF-8 BOM)
+_CLEAN_TBL = str.maketrans('', '', '•\x00\r\n\t\x0b\x0c\ufeff')
+
+def _clean_col(name):
+    """Strip whitespace and problematic characters from a column name"""
+    return name.strip().translate(_CLEAN_TBL)
+
+# Same clean-up plus spaces -> underscores, for column names created from CSV headers
+_SAFE_HEADER_TBL = str.maketrans({**{ord(ch): None for ch in '•\x00\r\n\t\x0b\x0c\ufeff'}, ord(' '): '_'})
+
+def _safe_header(name):
+    """Turn a CSV header into the SQL column name it is imported as"""
+    return name.strip().translate(_SAFE_HEADER_TBL)
+
+@functools.lru_cache(maxsize=128)
+def build_insert_sql(table_name, columns):
+    """Build (and remember) the INSERT statement for a table's column tuple"""
+    placeholders = ', '.join("NULLIF(?, '')" for _ in columns)
+    quoted_columns = ', '.join(f'`{col}`' for col in columns)
+    return f'INSERT INTO `{table_name}` ({quoted_columns}) VALUES ({placeholders})'
+
 def clean_value(value):
     """Clean and convert CSV values"""
     if not value or value.strip() == '' or value.upper() == 'N/A':
@@ -416,23 +586,28 @@ def parse_decimal(decimal_str):
     except ValueError:
         return None
 
+# Characters dropped from money values before parsing ("$1,234.50" -> "1234.50")
+_MONEY_TBL = str.maketrans('', '', '$, ')
+
 def parse_money_to_cents(money_str):
     """Parse monetary values from CSV and convert to cents (integer)"""
-    if not money_str or money_str.strip() == '' or money_str.upper() == 'N/A':
+    if not money_str:
         return None
     
-    money_str = clean_value(money_str)
-    if not money_str:
+    # Remove BOM/whitespace, then dollar signs, commas and inner spaces in one pass
+    money_str = money_str.strip().lstrip('\ufeff')
+    if not money_str or money_str.upper() == 'N/A':
         return None
     
-    # Remove dollar signs and commas
-    money_str = money_str.replace('$', '').replace(',', '')
+    # Accounting-style negatives: (12.50) -> -12.50
+    negative = money_str[0] == '(' and money_str[-1] == ')'
+    if negative:
+        money_str = money_str[1:-1]
     
     try:
         # Parse as float then convert to cents
-        dollars = float(money_str)
-        cents = int(round(dollars * 100))
-        return cents
+        cents = int(round(float(money_str.translate(_MONEY_TBL)) * 100))
+        return -cents if negative else cents
     except ValueError:
         return None
 
@@ -515,13 +690,20 @@ def load_healthcare_data(conn):
     
     print(f"Loaded {patient_count} patients, {invoice_count} invoices, {detail_count} invoice details")
 
+# Read CSVs in 1MB chunks - the default 8KB buffer means millions of reads for large exports
+CSV_READ_BUFFER_SIZE = 1 << 20
+
+def open_csv(path, encoding='utf-8-sig'):
+    """Open a CSV file for csv.reader/DictReader with a large read buffer"""
+    return open(path, 'r', encoding=encoding, newline='', buffering=CSV_READ_BUFFER_SIZE)
+
 def load_lookup_tables(conn):
     """Load lookup tables first"""
     # Service lines - extract from invoice data
     service_lines = set()
     
     # Read service lines from invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
+    with open_csv('HW_INVOICE.csv') as f:
         reader = csv.DictReader(f)
         for row in reader:
             service_line = clean_value(row.get('SERVICE_LINE'))
@@ -539,7 +721,7 @@ def load_lookup_tables(conn):
     insurance_plans = set()
     
     # From invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
+    with open_csv('HW_INVOICE.csv') as f:
         reader = csv.DictReader(f)
         for row in reader:
             # Current plan
@@ -568,7 +750,7 @@ def load_patients(conn):
     patients = set()
     
     # Extract unique patients from invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
+    with open_csv('HW_INVOICE.csv') as f:
         reader = csv.DictReader(f)
         for row in reader:
             patient_id = clean_value(row.get('NEW_PT_ID'))
@@ -588,7 +770,7 @@ def load_patients(conn):
 def load_invoices(conn):
     """Load invoice header data"""
     count = 0
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
+    with open_csv('HW_INVOICE.csv') as f:
         reader = csv.DictReader(f)
         
         for row in reader:
@@ -619,7 +801,7 @@ def load_invoices(conn):
 def load_invoice_details(conn):
     """Load invoice detail data (simplified)"""
     count = 0
-    with open('HW_CHARGES.csv', 'r', encoding='utf-8-sig') as f:
+    with open_csv('HW_CHARGES.csv') as f:
         reader = csv.DictReader(f)
         
         for row in reader:
@@ -742,87 +924,104 @@ def require_login(f):
 # Make version info available to all templates
 @app.context_processor
 def inject_version_info():
-    context = get_version_info()
+    context = dict(get_cached_version_info())
     context['time'] = time  # Make time module available to templates
     return context
 
-def format_query_results(results, columns):
-    """Format query results, converting cents back to dollars for money columns"""
-    if not results:
-        return results
-    
+# Maximum rows returned to the browser for a single user query
+MAX_ROWS = 10000
+
+# Limits for candidate queries scored by the challenge endpoint
+CHALLENGE_QUERY_TIMEOUT_SECONDS = float(os.getenv('CHALLENGE_QUERY_TIMEOUT_SECONDS', 5))
+CHALLENGE_QUERY_MAX_ROWS = 100000
+
+def get_money_columns(columns):
+    """Return the set of result columns that hold cents and should be shown as dollars"""
     # Detect money columns by name - temporarily disabled to prevent formatting errors
-    money_columns = []  # [col for col in columns if is_money_column(col)]
-    
-    formatted_results = []
-    for row in results:
-        formatted_row = {}
-        for column, value in row.items():
-            if column in money_columns and value is not None:
-                try:
-                    # Convert cents back to dollars for display
-                    formatted_row[column] = format_cents_to_dollars(value)
-                except Exception as e:
-                    print(f"Error formatting money column '{column}' with value '{value}' (type: {type(value)}): {e}")
-                    # If formatting fails, return the original value
-                    formatted_row[column] = value
-            else:
-                formatted_row[column] = value
-        formatted_results.append(formatted_row)
-    
-    return formatted_results
+    return set()  # {col for col in columns if is_money_column(col)}
+
+def format_money_values(row, money_columns):
+    """Convert cents back to dollars in place for the money columns of one row"""
+    for column in money_columns:
+        value = row.get(column)
+        if value is not None:
+            try:
+                # Convert cents back to dollars for display
+                row[column] = format_cents_to_dollars(value)
+            except Exception as e:
+                print(f"Error formatting money column '{column}' with value '{value}' (type: {type(value)}): {e}")
+                # If formatting fails, keep the original value
+    return row
+
+# Statements that may not appear anywhere in a user query
+DANGEROUS_KEYWORDS = frozenset({'DELETE', 'DROP', 'ALTER', 'INSERT', 'UPDATE', 'CREATE'})
 
-def execute_user_query(query):
+def validate_user_query(query):
+    """Return why a user query may not run, or None if it is an allowed SELECT"""
+    # Clean query by removing comments and normalizing
+    query_lines = []
+    for line in query.split('\n'):
+        # Remove SQL comments (-- style)
+        if '--' in line:
+            line = line[:line.index('--')]
+        line = line.strip()
+        if line:  # Only add non-empty lines
+            query_lines.append(line)
+    
+    query_clean = ' '.join(query_lines).strip().upper()
+    
+    # Basic security: only allow SELECT queries
+    if not query_clean.startswith('SELECT'):
+        return 'Only SELECT queries are allowed'
+    
+    # Prevent certain dangerous operations even in SELECT. Whole-word tokens are
+    # matched, so identifiers such as updated_at are not mistaken for UPDATE
+    prohibited = DANGEROUS_KEYWORDS.intersection(re.findall(r'[A-Z0-9_]+', query_clean))
+    if prohibited:
+        return f'Query contains prohibited operation: {min(prohibited)}'
+    
+    return None
+
+def execute_user_query(query, max_rows=MAX_ROWS, conn=None):
     """Execute user-provided SQL query safely (read-only)"""
-    conn = get_db_connection()
+    # Callers inside a request pass the pooled connection; otherwise open a private one
+    owns_connection = conn is None
+    if owns_connection:
+        conn = get_db_connection()
     try:
-        # Clean query by removing comments and normalizing
-        query_lines = []
-        for line in query.split('\n'):
-            # Remove SQL comments (-- style)
-            if '--' in line:
-                line = line[:line.index('--')]
-            line = line.strip()
-            if line:  # Only add non-empty lines
-                query_lines.append(line)
-        
-        query_clean = ' '.join(query_lines).strip().upper()
-        
-        # Basic security: only allow SELECT queries
-        if not query_clean.startswith('SELECT'):
+        error = validate_user_query(query)
+        if error:
             return {
                 'success': False,
-                'error': 'Only SELECT queries are allowed',
+                'error': error,
                 'results': [],
                 'columns': []
             }
         
-        # Prevent certain dangerous operations even in SELECT
-        dangerous_patterns = ['DELETE', 'DROP', 'ALTER', 'INSERT', 'UPDATE', 'CREATE', ';DELETE', ';DROP', ';ALTER', ';INSERT', ';UPDATE']
-        for pattern in dangerous_patterns:
-            if pattern in query_clean:
-                return {
-                    'success': False,
-                    'error': f'Query contains prohibited operation: {pattern}',
-                    'results': [],
-                    'columns': []
-                }
-        
         cursor = conn.execute(query)
-        results = cursor.fetchall()
         columns = [description[0] for description in cursor.description] if cursor.description else []
-        
-        # Convert Row objects to dictionaries for JSON serialization
-        results_list = [dict(row) for row in results]
-        
-        # Format money columns for display
-        formatted_results = format_query_results(results_list, columns)
+        money_columns = get_money_columns(columns)
+        
+        # Iterate the cursor instead of fetchall() and stop at max_rows, so an
+        # accidental SELECT * on a large table never materializes in memory.
+        # Rows are converted and money-formatted in the same pass.
+        results = []
+        truncated = False
+        for row in cursor:
+            if len(results) >= max_rows:
+                truncated = True
+                break
+            if money_columns:
+                results.append(format_money_values(dict(row), money_columns))
+            else:
+                results.append(dict(row))
         
         return {
             'success': True,
             'error': None,
-            'results': formatted_results,
-            'columns': columns
+            'results': results,
+            'columns': columns,
+            'truncated': truncated
         }
     except Exception as e:
         return {
@@ -832,36 +1031,79 @@ def execute_user_query(query):
             'columns': []
         }
     finally:
-        conn.close()
+        if owns_connection:
+            conn.close()
 
 def check_query_answer(user_query, expected_query):
     """Compare user query results with expected results"""
-    user_result = execute_user_query(user_query)
-    expected_result = execute_user_query(expected_query)
-    
-    if not user_result['success']:
+    error = validate_user_query(user_query)
+    if error:
         return {
             'correct': False,
-            'message': f"Query error: {user_result['error']}"
+            'message': f"Query error: {error}"
         }
     
-    if not expected_result['success']:
+    if validate_user_query(expected_query):
         return {
             'correct': False,
             'message': "System error with expected query"
         }
     
-    # Compare results
-    if user_result['results'] == expected_result['results']:
+    conn = get_db_connection()
+    try:
+        try:
+            user_cursor = conn.execute(user_query)
+        except Exception as e:
+            return {
+                'correct': False,
+                'message': f"Query error: {e}"
+            }
+        
+        try:
+            expected_cursor = conn.execute(expected_query)
+        except Exception:
+            return {
+                'correct': False,
+                'message': "System error with expected query"
+            }
+        
+        user_rows = _answer_rows(user_cursor)
+        expected_rows = _answer_rows(expected_cursor)
+        
+        # Walk both result sets in lockstep so they are compared in full without
+        # holding either in memory, stopping at the first difference
+        matched = 0
+        for user_row, expected_row in itertools.zip_longest(user_rows, expected_rows):
+            if user_row is None or expected_row is None or user_row != expected_row:
+                break
+            matched += 1
+        else:
+            return {
+                'correct': True,
+                'message': "Correct! Your query returned the expected results."
+            }
+        
+        # Count the rest of each side (without converting rows) for the message
+        user_count = matched + (user_row is not None) + sum(1 for _ in user_cursor)
+        expected_count = matched + (expected_row is not None) + sum(1 for _ in expected_cursor)
         return {
-            'correct': True,
-            'message': "Correct! Your query returned the expected results."
+            'correct': False,
+            'message': f"Incorrect. Your query returned {user_count} rows, expected {expected_count} rows."
         }
-    else:
+    except Exception as e:
         return {
             'correct': False,
-            'message': f"Incorrect. Your query returned {len(user_result['results'])} rows, expected {len(expected_result['results'])} rows."
+            'message': f"Query error: {e}"
         }
+    finally:
+        conn.close()
+
+def _answer_rows(cursor):
+    """Yield a cursor's rows as dicts, money-formatted the same way as displayed results"""
+    columns = [description[0] for description in cursor.description] if cursor.description else []
+    money_columns = get_money_columns(columns)
+    for row in cursor:
+        yield format_money_values(dict(row), money_columns)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -925,7 +1167,7 @@ def api_execute():
         })
     
     # Execute query
-    result = execute_user_query(query)
+    result = execute_user_query(query, conn=get_request_db())
     
     # Log the query execution
     user_id = session.get('user_id')
@@ -956,29 +1198,27 @@ def schema_reference():
 @require_login
 def api_schema():
     """Get database schema information"""
-    conn = get_db_connection()
-    try:
-        # Get table names
-        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
-        
-        schema_info = {}
-        for table in tables:
-            table_name = table['name']
-            # Get column information
-            columns = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
-            schema_info[table_name] = [
-                {
-                    'name': col['name'],
-                    'type': col['type'],
-                    'notnull': bool(col['notnull']),
-                    'pk': bool(col['pk'])
-                }
-                for col in columns
-            ]
-        
-        return jsonify(schema_info)
-    finally:
-        conn.close()
+    conn = get_request_db()
+    
+    # Get table names
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
+    
+    schema_info = {}
+    for table in tables:
+        table_name = table['name']
+        # Get column information
+        columns = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+        schema_info[table_name] = [
+            {
+                'name': col['name'],
+                'type': col['type'],
+                'notnull': bool(col['notnull']),
+                'pk': bool(col['pk'])
+            }
+            for col in columns
+        ]
+    
+    return jsonify(schema_info)
 
 @app.route('/api/tables')
 @require_login
@@ -998,27 +1238,26 @@ def api_tables():
 @require_login
 def api_sample_data(table_name):
     """Get sample data from a table"""
-    conn = get_db_connection()
-    try:
-        # Get all table names to validate
-        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
-        valid_tables = [table['name'] for table in tables]
-        
-        # Validate table name to prevent SQL injection
-        if table_name not in valid_tables:
-            return jsonify({'error': 'Invalid table name'}), 400
-        
-        # Get sample rows - using parameterized query would be ideal but table names can't be parameterized
-        # Since we've validated the table name exists, this is safe
-        query = f"SELECT * FROM `{table_name}` LIMIT 5"
-        rows = conn.execute(query).fetchall()
-        
-        # Convert to list of dictionaries
-        data = [dict(row) for row in rows]
-        
-        return jsonify(data)
-    finally:
-        conn.close()
+    # The pooled connection keeps sqlite3's prepared-statement cache warm across
+    # requests, so repeat previews of the same table skip parsing and planning
+    conn = get_request_db()
+    
+    # Validate table name to prevent SQL injection
+    table_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (table_name,)
+    ).fetchone()
+    if not table_exists:
+        return jsonify({'error': 'Invalid table name'}), 400
+    
+    # Get sample rows - using parameterized query would be ideal but table names can't be parameterized
+    # Since we've validated the table name exists, this is safe
+    query = f"SELECT * FROM `{table_name}` LIMIT 5"
+    data = rows_as_dicts(conn.execute(query))
+    
+    return jsonify(data)
+
+# Generated sample queries, keyed by PRAGMA schema_version of the healthcare database
+_sample_queries_cache = {}
 
 @app.route('/api/sample-queries')
 @require_login
@@ -1026,6 +1265,12 @@ def api_sample_queries():
     """Generate smart sample queries based on current schema"""
     conn = get_db_connection()
     try:
+        # Schema changes (uploads, drops) bump schema_version, so cached queries stay valid until then
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        cached_queries = _sample_queries_cache.get(schema_version)
+        if cached_queries is not None:
+            return jsonify(cached_queries)
+        
         # Get table names and their schemas
         tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
         table_names = [table['name'] for table in tables]
@@ -1061,63 +1306,65 @@ def api_sample_queries():
             t1_columns = [col['name'] for col in schema_info[table1]]
             t2_columns = [col['name'] for col in schema_info[table2]]
             
-            print(f"Table {table1} columns: {t1_columns}")
-            print(f"Table {table2} columns: {t2_columns}")
+            logger.debug("Table %s columns: %s", table1, t1_columns)
+            logger.debug("Table %s columns: %s", table2, t2_columns)
             
-            # Find potential join columns - prioritize meaningful relationships over just common names
+            # Find potential join columns - prefer declared relationships, then ID-like names.
+            # Only metadata is consulted here so large uploaded tables are never scanned.
             join_column = None
             
-            # First, look for ID-like columns that might have actual relationships
+            # First, use a declared foreign key between the two tables
+            for fk in conn.execute(f"PRAGMA foreign_key_list(`{table1}`)").fetchall():
+                if fk['table'] == table2 and fk['to']:
+                    join_column = f"{fk['from']} = {fk['to']}"
+                    logger.debug("Found foreign key join: %r", join_column)
+                    break
+            if not join_column:
+                for fk in conn.execute(f"PRAGMA foreign_key_list(`{table2}`)").fetchall():
+                    if fk['table'] == table1 and fk['to']:
+                        join_column = f"{fk['to']} = {fk['from']}"
+                        logger.debug("Found foreign key join: %r", join_column)
+                        break
+            
+            # Collect common columns (set lookup keeps this linear in column count), ID-like ones first
+            t2_set = set(t2_columns)
+            common_cleaned = [_clean_col(col) for col in t1_columns if col in t2_set]
+            
             id_candidates = []
-            for col in t1_columns:
-                if col in t2_columns:
-                    clean_col = col.strip()
-                    for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                        clean_col = clean_col.replace(char, '')
-                    
-                    if not clean_col:
-                        continue
-                        
-                    # Prioritize ID-like columns for joins
-                    col_lower = clean_col.lower()
-                    if any(pattern in col_lower for pattern in ['_id', 'id', 'invoice', 'patient', 'billing']):
-                        id_candidates.append(clean_col)
+            other_candidates = []
+            for clean_col in common_cleaned:
+                if not clean_col:
+                    continue
                     
-            # Test ID candidates first
-            for candidate in id_candidates:
-                try:
-                    # Check if this join would actually return results
-                    test_join = f"SELECT COUNT(*) FROM `{table1}` t1 JOIN `{table2}` t2 ON t1.`{candidate}` = t2.`{candidate}` LIMIT 1"
-                    result = conn.execute(test_join).fetchone()
-                    if result and result[0] > 0:
+                col_lower = clean_col.lower()
+                if any(pattern in col_lower for pattern in ['_id', 'id', 'invoice', 'patient', 'billing']):
+                    id_candidates.append(clean_col)
+                else:
+                    other_candidates.append(clean_col)
+            
+            # Trust the first common *_id / id column without verification -
+            # the generated SQL is only a sample the user can edit
+            if not join_column:
+                for candidate in id_candidates:
+                    col_lower = candidate.lower()
+                    if col_lower.endswith('_id') or col_lower == 'id':
                         join_column = candidate
-                        print(f"Found meaningful join column: {repr(candidate)} (would return {result[0]} rows)")
+                        logger.debug("Found ID join column: %r", candidate)
                         break
-                except Exception as e:
-                    print(f"Join test failed for {candidate}: {e}")
-                    continue
             
-            # If no meaningful ID joins found, fall back to any common column that returns results
+            # Otherwise verify the remaining candidates; EXISTS stops at the first
+            # matching pair instead of counting the whole join
             if not join_column:
-                for col in t1_columns:
-                    if col in t2_columns:
-                        clean_col = col.strip()
-                        for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                            clean_col = clean_col.replace(char, '')
-                        
-                        if not clean_col:
-                            continue
-                            
-                        try:
-                            # Test if this join returns any results
-                            test_join = f"SELECT COUNT(*) FROM `{table1}` t1 JOIN `{table2}` t2 ON t1.`{clean_col}` = t2.`{clean_col}` LIMIT 1"
-                            result = conn.execute(test_join).fetchone()
-                            if result and result[0] > 0:
-                                join_column = clean_col
-                                print(f"Found working join column: {repr(clean_col)} (would return {result[0]} rows)")
-                                break
-                        except Exception as e:
-                            continue
+                for candidate in id_candidates + other_candidates:
+                    try:
+                        test_join = f"SELECT EXISTS (SELECT 1 FROM `{table1}` t1 JOIN `{table2}` t2 ON t1.`{candidate}` = t2.`{candidate}`)"
+                        if conn.execute(test_join).fetchone()[0]:
+                            join_column = candidate
+                            logger.debug("Found working join column: %r", candidate)
+                            break
+                    except Exception as e:
+                        logger.debug("Join test failed for %s: %s", candidate, e)
+                        continue
             
             # If no exact match, look for ID patterns
             if not join_column:
@@ -1145,8 +1392,8 @@ JOIN {table2} t2 ON t1.{join_column} = t2.{join_column}
 LIMIT 15;"""
             else:
                 # No common columns found - provide a generic example with first columns of each table
-                t1_first = t1_columns[0].strip().replace('•', '').replace('\x00', '').replace('\r', '').replace('\n', '') if t1_columns else 'id'
-                t2_first = t2_columns[0].strip().replace('•', '').replace('\x00', '').replace('\r', '').replace('\n', '') if t2_columns else 'id'
+                t1_first = _clean_col(t1_columns[0]) if t1_columns else 'id'
+                t2_first = _clean_col(t2_columns[0]) if t2_columns else 'id'
                 queries['join'] = f"""-- Example JOIN query (adjust column names as needed)
 -- No common columns detected, showing example with first columns
 SELECT *
@@ -1168,15 +1415,14 @@ LIMIT 15;"""
         group_column = None
         count_column = None
         
-        print(f"Columns in {first_table}: {[col['name'] for col in columns]}")
+        logger.debug("Columns in %s: %s", first_table, [col['name'] for col in columns])
         
         # Look for columns with diverse values for meaningful grouping
         good_grouping_candidates = []
+        text_columns = []
         
         for col in columns:
-            clean_name = col['name'].strip()
-            for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                clean_name = clean_name.replace(char, '')
+            clean_name = _clean_col(col['name'])
             
             if not clean_name:
                 continue
@@ -1188,20 +1434,26 @@ LIMIT 15;"""
                 continue
                 
             if col['type'] == 'TEXT':
-                try:
-                    # Test how many distinct values this column has
-                    distinct_query = f"SELECT COUNT(DISTINCT `{clean_name}`) as distinct_count FROM `{first_table}`"
-                    distinct_result = conn.execute(distinct_query).fetchone()
-                    distinct_count = distinct_result[0] if distinct_result else 0
-                    
-                    # Good grouping columns have multiple but not too many distinct values
-                    if 2 <= distinct_count <= 100:  # Sweet spot for meaningful grouping
-                        good_grouping_candidates.append((clean_name, distinct_count))
-                        print(f"Found potential group column: {repr(clean_name)} with {distinct_count} distinct values")
-                        
-                except Exception as e:
-                    print(f"Could not test distinct values for {clean_name}: {e}")
-                    continue
+                text_columns.append(clean_name)
+        
+        # Count distinct values for all text columns in one table scan,
+        # chunked to keep very wide tables within SQLite's expression limits
+        for i in range(0, len(text_columns), 32):
+            chunk = text_columns[i:i + 32]
+            try:
+                distinct_query = "SELECT " + ", ".join(
+                    f"COUNT(DISTINCT `{name}`)" for name in chunk
+                ) + f" FROM `{first_table}`"
+                distinct_result = conn.execute(distinct_query).fetchone()
+            except Exception as e:
+                logger.debug("Could not test distinct values for %s: %s", chunk, e)
+                continue
+            
+            for clean_name, distinct_count in zip(chunk, distinct_result):
+                # Good grouping columns have multiple but not too many distinct values
+                if 2 <= distinct_count <= 100:  # Sweet spot for meaningful grouping
+                    good_grouping_candidates.append((clean_name, distinct_count))
+                    logger.debug("Found potential group column: %r with %d distinct values", clean_name, distinct_count)
         
         # Sort by number of distinct values (prefer moderate diversity)
         good_grouping_candidates.sort(key=lambda x: x[1])
@@ -1209,57 +1461,35 @@ LIMIT 15;"""
         # Pick the best candidate
         if good_grouping_candidates:
             group_column = good_grouping_candidates[0][0]
-            print(f"Selected group column: {repr(group_column)} ({good_grouping_candidates[0][1]} distinct values)")
+            logger.debug("Selected group column: %r (%d distinct values)", group_column, good_grouping_candidates[0][1])
         else:
-            print("No good grouping columns found, will use fallback")
+            logger.debug("No good grouping columns found, will use fallback")
         
         # Look for ID or countable columns
         for col in columns:
-            clean_name = col['name'].strip()
-            for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                clean_name = clean_name.replace(char, '')
+            clean_name = _clean_col(col['name'])
                 
             if not clean_name:
                 continue
                 
             col_name = clean_name.lower()
             
+            # Names come straight from PRAGMA table_info, so a non-empty cleaned
+            # name is a valid column by construction - no probe query needed
             if col_name.endswith('_id') or col_name == 'id' or col['pk']:
-                # Validate with multiple quote styles
-                test_queries = [
-                    f"SELECT `{clean_name}` FROM `{first_table}` LIMIT 1",
-                    f"SELECT [{clean_name}] FROM `{first_table}` LIMIT 1",
-                    f"SELECT \"{clean_name}\" FROM `{first_table}` LIMIT 1",
-                    f"SELECT {clean_name} FROM `{first_table}` LIMIT 1"
-                ]
-                
-                query_worked = False
-                for test_query in test_queries:
-                    try:
-                        conn.execute(test_query).fetchone()
-                        count_column = clean_name
-                        print(f"Found valid count column: {repr(clean_name)} using query: {test_query}")
-                        query_worked = True
-                        break
-                    except:
-                        continue
-                        
-                if query_worked:
-                    break
+                count_column = clean_name
+                logger.debug("Found count column: %r", clean_name)
+                break
         
         if not group_column:
             # Use first available column as fallback
             if columns:
-                group_column = columns[0]['name'].strip()
-                for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                    group_column = group_column.replace(char, '')
+                group_column = _clean_col(columns[0]['name'])
             else:
                 group_column = 'column_name'
         if not count_column:
             if columns:
-                count_column = columns[0]['name'].strip()
-                for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                    count_column = count_column.replace(char, '')
+                count_column = _clean_col(columns[0]['name'])
             else:
                 count_column = 'id'
         
@@ -1272,6 +1502,9 @@ FROM {first_table}
 GROUP BY {group_column}
 ORDER BY record_count DESC;"""
         
+        _sample_queries_cache.clear()
+        _sample_queries_cache[schema_version] = queries
+        
         return jsonify(queries)
         
     finally:
@@ -1303,7 +1536,7 @@ def api_debug_columns():
                 'pragma_columns': [
                     {
                         'name': repr(col['name']),  # Use repr to show hidden characters
-                        'clean_name': col['name'].strip().replace('•', '').replace('\x00', ''),
+                        'clean_name': _clean_col(col['name']),
                         'type': col['type']
                     }
                     for col in columns_pragma
@@ -1354,7 +1587,7 @@ def data_upload():
 
 def clear_healthcare_database(conn):
     """Clear all data from healthcare database, keeping only the structure"""
-    print("Clearing existing healthcare database data...")
+    logger.info("Clearing existing healthcare database data...")
     
     # Get all table names from the healthcare database
     tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
@@ -1364,38 +1597,42 @@ def clear_healthcare_database(conn):
         try:
             # Drop the table completely
             conn.execute(f'DROP TABLE IF EXISTS `{table_name}`')
-            print(f"Dropped table: {table_name}")
+            logger.debug("Dropped table: %s", table_name)
         except Exception as e:
-            print(f"Error dropping table {table_name}: {e}")
+            logger.warning("Error dropping table %s: %s", table_name, e)
     
     conn.commit()
-    print("Healthcare database cleared successfully")
+    logger.info("Healthcare database cleared successfully")
 
 def process_zip_upload(zip_file):
     """Process uploaded ZIP file and create tables from CSV files"""
     conn = get_db_connection()
     try:
+        # Bulk-load settings for this upload connection only - the import is
+        # all-or-nothing anyway, so skip per-commit fsyncs and give the load a bigger page cache
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA cache_size = -200000')  # ~200MB
+        
         # Clear existing data from healthcare database before importing new data
         clear_healthcare_database(conn)
         
+        # One explicit transaction for every CREATE TABLE and INSERT in the upload,
+        # so the whole import costs a single commit
+        conn.execute('BEGIN')
+        
         # Create temporary directory
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Save uploaded file
-            zip_path = os.path.join(temp_dir, secure_filename(zip_file.filename))
-            zip_file.save(zip_path)
-            
-            # Extract ZIP file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Find CSV files (exclude macOS metadata files)
-            csv_files = []
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    if (file.lower().endswith('.csv') and 
-                        not file.startswith('._') and 
-                        not file.startswith('.DS_Store')):
-                        csv_files.append(os.path.join(root, file))
+            # Read the archive straight from the upload stream. Only the CSV members
+            # are written out, since create_table_from_csv needs a seekable file
+            zip_file.stream.seek(0)
+            with zipfile.ZipFile(zip_file.stream) as zip_ref:
+                # Find CSV files (exclude directories and macOS metadata files)
+                csv_files = [
+                    zip_ref.extract(info, temp_dir) for info in zip_ref.infolist()
+                    if not info.is_dir()
+                    and info.filename.lower().endswith('.csv')
+                    and not os.path.basename(info.filename).startswith(('._', '.DS_Store'))
+                ]
             
             if not csv_files:
                 return {'success': False, 'error': 'No CSV files found in ZIP archive'}
@@ -1412,21 +1649,21 @@ def process_zip_upload(zip_file):
                     # Sanitize table name
                     table_name = re.sub(r'[^a-zA-Z0-9_]', '_', table_name).lower()
                     
-                    print(f"Processing CSV file: {os.path.basename(csv_file_path)} -> table: {table_name}")
+                    logger.info("Processing CSV file: %s -> table: %s", os.path.basename(csv_file_path), table_name)
                     
                     # Read CSV and create table
                     if create_table_from_csv(conn, csv_file_path, table_name):
                         tables_created += 1
-                        print(f"Successfully created table: {table_name}")
+                        logger.info("Successfully created table: %s", table_name)
                     else:
                         error_msg = f"Failed to create table from {os.path.basename(csv_file_path)}"
-                        print(error_msg)
+                        logger.warning(error_msg)
                         errors.append(error_msg)
                     
                 except Exception as e:
                     error_msg = f"Error processing {os.path.basename(csv_file_path)}: {str(e)}"
-                    print(f"Detailed error for {csv_file_path}: {repr(e)}")
-                    print(f"Error type: {type(e).__name__}")
+                    logger.warning("Detailed error for %s: %r", csv_file_path, e)
+                    logger.warning("Error type: %s", type(e).__name__)
                     errors.append(error_msg)
             
             conn.commit()
@@ -1449,165 +1686,217 @@ def process_zip_upload(zip_file):
     finally:
         conn.close()
 
+# Rows sent to SQLite per executemany() call during CSV import
+CSV_INSERT_BATCH_SIZE = 10000
+
+# Path to SQLite's csv virtual table extension (ext/misc/csv.c), if installed.
+# When set, CSVs without money columns are imported natively by SQLite.
+SQLITE_CSV_EXTENSION = os.getenv('SQLITE_CSV_EXTENSION')
+
+def import_csv_natively(conn, csv_file_path, table_name, column_count):
+    """Bulk insert a comma-separated file through SQLite's csv virtual table.
+    
+    Returns the number of rows inserted, or None if the extension is unavailable
+    and the caller should fall back to the Python import loop.
+    """
+    if not SQLITE_CSV_EXTENSION or not hasattr(conn, 'enable_load_extension'):
+        return None
+    
+    try:
+        conn.enable_load_extension(True)
+        try:
+            conn.load_extension(SQLITE_CSV_EXTENSION)
+        finally:
+            conn.enable_load_extension(False)
+    except sqlite3.Error as e:
+        logger.warning("Could not load csv extension %s: %s", SQLITE_CSV_EXTENSION, e)
+        return None
+    
+    columns = [f'c{i}' for i in range(column_count)]
+    filename = csv_file_path.replace("'", "''")
+    schema = f"CREATE TABLE x({', '.join(columns)})"
+    conn.execute(
+        f"CREATE VIRTUAL TABLE temp.csv_in USING csv("
+        f"filename='{filename}', header=YES, columns={column_count}, schema='{schema}')"
+    )
+    try:
+        # Match the Python loop: empty fields become NULL and blank lines are skipped
+        values_sql = ', '.join(f"NULLIF({col}, '')" for col in columns)
+        blank_line = "c0 = ''" if column_count == 1 else "c0 = '' AND c1 IS NULL"
+        cursor = conn.execute(
+            f"INSERT INTO `{table_name}` SELECT {values_sql} FROM temp.csv_in WHERE NOT ({blank_line})"
+        )
+        return cursor.rowcount
+    finally:
+        conn.execute('DROP TABLE temp.csv_in')
+
 def create_table_from_csv(conn, csv_file_path, table_name):
     """Create SQLite table from CSV file with 1:1 mapping - preserving original data"""
     try:
-        with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-            # Detect delimiter with fallback options
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
+        with open(csv_file_path, 'rb', buffering=CSV_READ_BUFFER_SIZE) as raw, \
+                io.TextIOWrapper(raw, encoding='utf-8', newline='') as csvfile:
+            # Detect delimiter with fallback options; peeking at the buffer means
+            # the file is read front to back exactly once
+            sample = raw.peek(1024)[:1024].decode('utf-8', errors='ignore')
             
             delimiter = ','  # Default to comma
             try:
                 sniffer = csv.Sniffer()
                 dialect = sniffer.sniff(sample, delimiters=',\t;|')
                 delimiter = dialect.delimiter
-                print(f"Detected delimiter for {os.path.basename(csv_file_path)}: {repr(delimiter)}")
+                logger.debug("Detected delimiter for %s: %r", os.path.basename(csv_file_path), delimiter)
             except Exception as e:
-                print(f"Could not detect delimiter for {os.path.basename(csv_file_path)}: {e}")
+                logger.debug("Could not detect delimiter for %s: %s", os.path.basename(csv_file_path), e)
                 # Try common delimiters manually
                 delimiters = [',', '\t', ';', '|']
                 for test_delim in delimiters:
                     test_line = sample.split('\n')[0] if '\n' in sample else sample
                     if test_delim in test_line and test_line.count(test_delim) > 0:
                         delimiter = test_delim
-                        print(f"Manually detected delimiter: {repr(delimiter)}")
+                        logger.debug("Manually detected delimiter: %r", delimiter)
                         break
                 else:
-                    print(f"Using default delimiter: {repr(delimiter)}")
-                    print(f"Sample content: {repr(sample[:200])}")  # Show first 200 chars for debugging
+                    logger.debug("Using default delimiter: %r", delimiter)
+                    logger.debug("Sample content: %r", sample[:200])  # Show first 200 chars for debugging
             
             reader = csv.reader(csvfile, delimiter=delimiter)
             headers = next(reader)
             
             if not headers:
-                print(f"No headers found in {csv_file_path}")
+                logger.warning("No headers found in %s", csv_file_path)
                 return False
             
-            print(f"Found {len(headers)} columns: {headers[:5]}...")  # Show first 5 headers
+            logger.debug("Found %d columns: %s...", len(headers), headers[:5])  # Show first 5 headers
             
             # Keep original column names but quote them for SQL safety
             # Clean problematic characters including UTF-8 BOM
-            sql_safe_headers = []
-            for header in headers:
-                # Clean problematic characters first, then replace spaces with underscores
-                safe_header = header.strip()
-                # Remove problematic characters including UTF-8 BOM
-                for char in ['•', '\x00', '\r', '\n', '\t', '\x0b', '\x0c', '\ufeff']:
-                    safe_header = safe_header.replace(char, '')
-                # Replace spaces with underscores for SQL compatibility  
-                safe_header = safe_header.replace(' ', '_')
-                sql_safe_headers.append(safe_header)
-                
-                if header != safe_header:
-                    print(f"Cleaned column name: '{repr(header)}' -> '{repr(safe_header)}'")
+            sql_safe_headers = [_safe_header(header) for header in headers]
+            if logger.isEnabledFor(logging.DEBUG):
+                for header, safe_header in zip(headers, sql_safe_headers):
+                    if header != safe_header:
+                        logger.debug("Cleaned column name: %r -> %r", header, safe_header)
             
-            # Peek at first few rows to determine column types
-            csvfile.seek(0)
-            reader = csv.DictReader(csvfile, delimiter=delimiter)
-            sample_rows = []
-            for i, row in enumerate(reader):
-                if i >= 10:  # Sample first 10 rows
-                    break
-                sample_rows.append(row)
+            # Money columns are a property of the header, so detect them once
+            money_indexes = [i for i, header in enumerate(headers) if is_money_column(header)]
             
-            if not sample_rows:
-                print(f"No data rows found in {csv_file_path}")
+            # Read the first data row from the same stream - the file is parsed in a single pass
+            first_row = next((row for row in reader if row), None)
+            if first_row is None:
+                logger.warning("No data rows found in %s", csv_file_path)
                 return False
             
             # Determine column types (simplified - mostly TEXT to preserve data)
-            column_types = {}
-            for header, safe_header in zip(headers, sql_safe_headers):
-                # For most columns, just use TEXT to preserve original data
-                # Only use INTEGER for clearly numeric money columns
-                if is_money_column(header):
-                    column_types[safe_header] = 'INTEGER'  # Store as cents
-                    print(f"Detected money column: {header} -> {safe_header}")
-                else:
-                    column_types[safe_header] = 'TEXT'  # Preserve everything else as text
+            # For most columns, just use TEXT to preserve original data
+            # Only use INTEGER for clearly numeric money columns (stored as cents)
+            column_types = {safe_header: 'TEXT' for safe_header in sql_safe_headers}
+            for i in money_indexes:
+                column_types[sql_safe_headers[i]] = 'INTEGER'
+                logger.debug("Detected money column: %s -> %s", headers[i], sql_safe_headers[i])
             
             # Drop table if exists (for reimport)
             conn.execute(f'DROP TABLE IF EXISTS `{table_name}`')
             
             # Create table with quoted column names
-            columns_sql = ', '.join([f'`{col}` {col_type}' for col, col_type in column_types.items()])
+            columns_sql = ', '.join(f'`{col}` {col_type}' for col, col_type in column_types.items())
             create_sql = f'CREATE TABLE `{table_name}` ({columns_sql})'
             conn.execute(create_sql)
             
-            # Insert data
-            csvfile.seek(0)
-            reader = csv.DictReader(csvfile, delimiter=delimiter)
+            # Plain comma-separated files with no money columns need no per-value
+            # conversion, so let SQLite read them directly when it can
+            if not money_indexes and delimiter == ',':
+                rows_inserted = import_csv_natively(conn, csv_file_path, table_name, len(sql_safe_headers))
+                if rows_inserted is not None:
+                    logger.info("Created table '%s' with %d columns and %d rows (native import)",
+                                table_name, len(sql_safe_headers), rows_inserted)
+                    return True
             
-            placeholders = ', '.join(['?' for _ in sql_safe_headers])
-            quoted_headers = ', '.join([f'`{h}`' for h in sql_safe_headers])
-            insert_sql = f'INSERT INTO `{table_name}` ({quoted_headers}) VALUES ({placeholders})'
+            # Insert data straight from csv.reader rows, continuing the same stream.
+            # Empty strings become NULL inside SQLite via NULLIF, so only money
+            # columns need per-value Python work.
+            column_count = len(sql_safe_headers)
             
+            insert_sql = build_insert_sql(table_name, tuple(sql_safe_headers))
+            
+            # Insert in batches; the upload commits once in process_zip_upload
             rows_inserted = 0
-            for row in reader:
-                values = []
-                for header, safe_header in zip(headers, sql_safe_headers):
-                    value = row.get(header, '')  # Keep original value including empty strings
-                    
-                    # Only convert money columns to cents, keep everything else as-is
-                    if is_money_column(header) and value and value.strip():
-                        # Convert dollars to cents for money columns
+            batch = []
+            for row in itertools.chain([first_row], reader):
+                if not row:
+                    continue  # Skip blank lines
+                if len(row) != column_count:
+                    # Pad short rows and drop extra fields so every row matches the header
+                    row = (row + [''] * column_count)[:column_count]
+                
+                # Only convert money columns to cents, keep everything else as-is
+                for i in money_indexes:
+                    value = row[i]
+                    if value and value.strip():
                         cents_value = parse_money_to_cents(value)
-                        if cents_value is not None:
-                            values.append(cents_value)
-                        else:
-                            # If money parsing failed, store as 0 or NULL
-                            print(f"Warning: Could not parse money value '{value}' in column '{header}', storing as NULL")
-                            values.append(None)
-                    else:
-                        # Keep original value exactly as-is
-                        values.append(value if value else None)
+                        if cents_value is None:
+                            logger.warning("Could not parse money value %r in column %r, storing as NULL", value, headers[i])
+                        row[i] = cents_value
                 
-                conn.execute(insert_sql, values)
-                rows_inserted += 1
+                batch.append(row)
+                if len(batch) >= CSV_INSERT_BATCH_SIZE:
+                    conn.executemany(insert_sql, batch)
+                    rows_inserted += len(batch)
+                    batch = []
+            
+            if batch:
+                conn.executemany(insert_sql, batch)
+                rows_inserted += len(batch)
         
-        print(f"Created table '{table_name}' with {len(sql_safe_headers)} columns and {rows_inserted} rows")
+        logger.info("Created table '%s' with %d columns and %d rows", table_name, len(sql_safe_headers), rows_inserted)
         return True
         
     except Exception as e:
-        print(f"Error creating table from {csv_file_path}: {str(e)}")
+        logger.warning("Error creating table from %s: %s", csv_file_path, e)
         return False
 
+# Type inference looks at no more than this many non-empty sample values
+MAX_TYPE_SAMPLE_SIZE = 200
+
+# Currency formatting removed before numeric detection
+_STRIP_MONEY_TBL = str.maketrans('', '', '$,')
+
 def determine_column_type(sample_rows, column_name):
-    """Determine SQLite column type based on sample data"""
-    values = [row.get(column_name, '').strip() for row in sample_rows if row.get(column_name, '').strip()]
-    
-    if not values:
-        return 'TEXT'
+    """Determine SQLite column type based on sample data (single pass, stops early)"""
+    money_column = is_money_column(column_name)
     
-    # Check if this is a money column first
-    if is_money_column(column_name):
-        # Money columns should be INTEGER (stored as cents)
-        return 'INTEGER'
-    
-    # Check if all values are integers
+    total_count = 0
     int_count = 0
     float_count = 0
     
-    for value in values:
-        if value.lower() in ['null', 'none', 'n/a', '']:
+    for row in sample_rows:
+        value = (row.get(column_name) or '').strip()
+        if not value:
+            continue
+        
+        # Money columns should be INTEGER (stored as cents) once any data is present
+        if money_column:
+            return 'INTEGER'
+        
+        if total_count >= MAX_TYPE_SAMPLE_SIZE:
+            break
+        total_count += 1
+        
+        if value.lower() in ('null', 'none', 'n/a'):
             continue
-            
-        # Remove $ and commas for numeric detection
-        clean_value_for_test = value.replace('$', '').replace(',', '')
         
         try:
-            float_val = float(clean_value_for_test)
-            if float_val.is_integer():
-                int_count += 1
-            else:
-                float_count += 1
+            float_val = float(value.translate(_STRIP_MONEY_TBL))
         except (ValueError, TypeError):
             # Not numeric
             return 'TEXT'
+        
+        if float_val.is_integer():
+            int_count += 1
+        else:
+            float_count += 1
     
     # If more than 80% are numeric
     total_numeric = int_count + float_count
-    if total_numeric > 0 and total_numeric / len(values) > 0.8:
+    if total_numeric > 0 and total_numeric / total_count > 0.8:
         # If all numeric values are integers, use INTEGER type
         if float_count == 0:
             return 'INTEGER'
@@ -1623,81 +1912,83 @@ def challenges():
     """Challenge mode - data analysis problems for candidates"""
     return render_template('challenges.html')
 
+# Each active challenge as a ready-made JSON object; JSON1 validates and embeds the
+# stored hints so no per-row json.loads/dumps happens in Python
+_SQL_CHALLENGES_LIST = '''
+    SELECT difficulty_level,
+           json_object(
+               'id', id, 'title', title, 'description', description,
+               'difficulty_level', difficulty_level, 'category', category,
+               'hints', json(CASE WHEN json_valid(hints) THEN hints ELSE '[]' END),
+               'max_score', max_score, 'time_limit_minutes', time_limit_minutes,
+               'is_active', is_active
+           ) AS challenge_json
+    FROM challenges 
+    WHERE is_active = 1 
+    ORDER BY difficulty_level, id
+'''
+
+CHALLENGE_LEVEL_NAMES = {1: 'Basic', 2: 'Intermediate', 3: 'Advanced', 4: 'Expert'}
+
 @app.route('/api/challenges')
 @require_login
 def api_challenges():
     """Get all available challenges grouped by difficulty level"""
-    conn = get_db_connection()
-    try:
-        challenges = conn.execute('''
-            SELECT id, title, description, difficulty_level, category, hints, 
-                   max_score, time_limit_minutes, is_active
-            FROM challenges 
-            WHERE is_active = 1 
-            ORDER BY difficulty_level, id
-        ''').fetchall()
-        
-        # Group by difficulty level
-        levels = {
-            1: {'name': 'Basic', 'challenges': []},
-            2: {'name': 'Intermediate', 'challenges': []},
-            3: {'name': 'Advanced', 'challenges': []},
-            4: {'name': 'Expert', 'challenges': []}
-        }
-        
-        for challenge in challenges:
-            level = challenge['difficulty_level']
-            if level in levels:
-                challenge_data = dict(challenge)
-                # Parse hints from JSON
-                try:
-                    challenge_data['hints'] = json.loads(challenge_data['hints'])
-                except:
-                    challenge_data['hints'] = []
-                levels[level]['challenges'].append(challenge_data)
-        
-        return jsonify(levels)
-    finally:
-        conn.close()
+    conn = get_request_db()
+    challenges = conn.execute(_SQL_CHALLENGES_LIST).fetchall()
+    
+    # Group the pre-serialized challenges by difficulty level
+    levels = {level: [] for level in CHALLENGE_LEVEL_NAMES}
+    for level, challenge_json in challenges:
+        if level in levels:
+            levels[level].append(challenge_json)
+    
+    # Assemble the response document directly from the JSON fragments
+    body = ','.join(
+        f'"{level}":{{"challenges":[{",".join(levels[level])}],"name":{json.dumps(name)}}}'
+        for level, name in CHALLENGE_LEVEL_NAMES.items()
+    )
+    return app.response_class('{' + body + '}', mimetype='application/json')
+
+_SQL_CHALLENGE_DETAIL = '''
+    SELECT id, title, description, difficulty_level, category, hints, 
+           max_score, time_limit_minutes, expected_result_count
+    FROM challenges 
+    WHERE id = ? AND is_active = 1
+'''
+
+_SQL_CHALLENGE_RECENT_ATTEMPTS = '''
+    SELECT id, query_text, is_correct, score, hints_used, execution_time_ms,
+           created_at
+    FROM challenge_attempts 
+    WHERE user_id = ? AND challenge_id = ?
+    ORDER BY created_at DESC
+    LIMIT 5
+'''
 
 @app.route('/api/challenge/<int:challenge_id>')
 @require_login
 def api_challenge_detail(challenge_id):
     """Get detailed information about a specific challenge"""
-    conn = get_db_connection()
+    conn = get_request_db()
+    challenge = conn.execute(_SQL_CHALLENGE_DETAIL, (challenge_id,)).fetchone()
+    
+    if not challenge:
+        return jsonify({'error': 'Challenge not found'}), 404
+    
+    challenge_data = dict(challenge)
+    # Parse hints from JSON
     try:
-        challenge = conn.execute('''
-            SELECT id, title, description, difficulty_level, category, hints, 
-                   max_score, time_limit_minutes, expected_result_count
-            FROM challenges 
-            WHERE id = ? AND is_active = 1
-        ''', (challenge_id,)).fetchone()
-        
-        if not challenge:
-            return jsonify({'error': 'Challenge not found'}), 404
+        challenge_data['hints'] = json.loads(challenge_data['hints'])
+    except:
+        challenge_data['hints'] = []
         
-        challenge_data = dict(challenge)
-        # Parse hints from JSON
-        try:
-            challenge_data['hints'] = json.loads(challenge_data['hints'])
-        except:
-            challenge_data['hints'] = []
-            
-        # Get user's progress on this challenge
-        attempts = conn.execute('''
-            SELECT id, query_text, is_correct, score, hints_used, execution_time_ms,
-                   created_at
-            FROM challenge_attempts 
-            WHERE user_id = ? AND challenge_id = ?
-            ORDER BY created_at DESC
-            LIMIT 5
-        ''', (session.get('user_id'), challenge_id)).fetchall()
-        
-        challenge_data['recent_attempts'] = [dict(attempt) for attempt in attempts]
-        
-        return jsonify(challenge_data)
-    finally:
-        conn.close()
+    # Get user's progress on this challenge
+    attempts = conn.execute(_SQL_CHALLENGE_RECENT_ATTEMPTS, (session.get('user_id'), challenge_id))
+    
+    challenge_data['recent_attempts'] = rows_as_dicts(attempts)
+    
+    return jsonify(challenge_data)
 
 @app.route('/api/challenge/<int:challenge_id>/attempt', methods=['POST'])
 @require_login
@@ -1726,8 +2017,12 @@ def api_challenge_attempt(challenge_id):
         start_time = time.time()
         try:
             # Execute the user's query against the database
-            user_conn = get_db_connection()
-            result = user_conn.execute(query).fetchall()
+            user_conn = get_readonly_db_connection()
+            # Abort runaway queries: SQLite calls the handler every 10k VM
+            # instructions and interrupts the statement once it returns non-zero
+            deadline = start_time + CHALLENGE_QUERY_TIMEOUT_SECONDS
+            user_conn.set_progress_handler(lambda: 1 if time.time() > deadline else 0, 10000)
+            result = list(itertools.islice(user_conn.execute(query), CHALLENGE_QUERY_MAX_ROWS))
             execution_time_ms = int((time.time() - start_time) * 1000)
             
             # Evaluate the result
@@ -1766,15 +2061,15 @@ def api_challenge_attempt(challenge_id):
             
             # Update user progress
             conn.execute('''
-                INSERT OR REPLACE INTO user_challenge_progress 
+                INSERT INTO user_challenge_progress 
                 (user_id, challenge_id, best_score, total_attempts, is_completed)
-                VALUES (?, ?, 
-                        COALESCE(MAX(best_score, ?), ?),
-                        COALESCE((SELECT total_attempts FROM user_challenge_progress 
-                                 WHERE user_id = ? AND challenge_id = ?), 0) + 1,
-                        ?)
-            ''', (session.get('user_id'), challenge_id, score, score, 
-                  session.get('user_id'), challenge_id, is_correct))
+                VALUES (?, ?, ?, 1, ?)
+                ON CONFLICT(user_id, challenge_id) DO UPDATE SET
+                    best_score = MAX(best_score, excluded.best_score),
+                    total_attempts = total_attempts + 1,
+                    is_completed = is_completed OR excluded.is_completed,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (session.get('user_id'), challenge_id, score, is_correct))
             
             conn.commit()
             
@@ -1791,6 +2086,8 @@ def api_challenge_attempt(challenge_id):
             })
             
         except Exception as e:
+            if isinstance(e, sqlite3.OperationalError) and str(e) == 'interrupted':
+                e = f'query took longer than {CHALLENGE_QUERY_TIMEOUT_SECONDS:g} seconds'
             return jsonify({
                 'success': False,
                 'error': f'Query execution error: {str(e)}',
@@ -1808,8 +2105,29 @@ def api_challenge_attempt(challenge_id):
 @require_login
 def api_user_progress():
     """Get user's overall progress across all challenges"""
-    conn = get_db_connection()
-    try:
+    conn = get_request_db()
+    user_id = session.get('user_id')
+    
+    # Calculate overall statistics in SQLite rather than summing rows in Python
+    stats = conn.execute('''
+        SELECT COUNT(*) as total_challenges,
+               COALESCE(SUM(CASE WHEN p.is_completed THEN 1 ELSE 0 END), 0) as completed_challenges,
+               COALESCE(SUM(COALESCE(p.best_score, 0)), 0) as total_score,
+               COALESCE(SUM(COALESCE(NULLIF(c.max_score, 0), 100)), 0) as max_possible_score,
+               COALESCE(ROUND(100.0 * SUM(CASE WHEN p.is_completed THEN 1 ELSE 0 END)
+                              / NULLIF(COUNT(*), 0), 1), 0) as completion_rate,
+               COALESCE(ROUND(100.0 * SUM(COALESCE(p.best_score, 0))
+                              / NULLIF(SUM(COALESCE(NULLIF(c.max_score, 0), 100)), 0), 1), 0) as score_percentage
+        FROM challenges c
+        LEFT JOIN user_challenge_progress p ON c.id = p.challenge_id 
+            AND p.user_id = ?
+        WHERE c.is_active = 1
+    ''', (user_id,)).fetchone()
+    
+    response = {'stats': dict(stats)}
+    
+    # The per-challenge list is only fetched when asked for (?include=list)
+    if request.args.get('include') == 'list':
         progress = conn.execute('''
             SELECT c.difficulty_level, c.title, c.category, c.max_score,
                    p.best_score, p.total_attempts, p.is_completed
@@ -1818,27 +2136,10 @@ def api_user_progress():
                 AND p.user_id = ?
             WHERE c.is_active = 1
             ORDER BY c.difficulty_level, c.id
-        ''', (session.get('user_id'),)).fetchall()
-        
-        # Calculate overall statistics
-        total_challenges = len(progress)
-        completed_challenges = sum(1 for p in progress if p['is_completed'])
-        total_score = sum(p['best_score'] or 0 for p in progress)
-        max_possible_score = sum(p['max_score'] or 100 for p in progress)
-        
-        return jsonify({
-            'challenges': [dict(p) for p in progress],
-            'stats': {
-                'total_challenges': total_challenges,
-                'completed_challenges': completed_challenges,
-                'completion_rate': round(completed_challenges / total_challenges * 100, 1) if total_challenges > 0 else 0,
-                'total_score': total_score,
-                'max_possible_score': max_possible_score,
-                'score_percentage': round(total_score / max_possible_score * 100, 1) if max_possible_score > 0 else 0
-            }
-        })
-    finally:
-        conn.close()
+        ''', (user_id,))
+        response['challenges'] = rows_as_dicts(progress)
+    
+    return jsonify(response)
 
 # Admin interface routes
 @app.route('/admin')
@@ -1859,215 +2160,250 @@ def admin_candidate_detail(username):
     """View detailed candidate assessment"""
     return render_template('admin/candidate_detail.html', username=username)
 
+_SQL_ADMIN_CANDIDATES = '''
+    SELECT u.username, u.created_at as registration_date,
+           COALESCE(a.challenges_attempted, 0) as challenges_attempted,
+           COALESCE(a.challenges_completed, 0) as challenges_completed,
+           a.best_score, a.total_score,
+           COALESCE(a.total_attempts, 0) as total_attempts,
+           a.avg_execution_time, a.total_hints_used,
+           u.last_activity,
+           COALESCE(ROUND(100.0 * a.challenges_completed / NULLIF(a.challenges_attempted, 0), 1), 0) as completion_rate
+    FROM users u
+    LEFT JOIN (
+        SELECT user_id,
+               COUNT(DISTINCT challenge_id) as challenges_attempted,
+               COUNT(DISTINCT CASE WHEN is_correct = 1 THEN challenge_id END) as challenges_completed,
+               MAX(score) as best_score,
+               SUM(score) as total_score,
+               COUNT(id) as total_attempts,
+               AVG(execution_time_ms) as avg_execution_time,
+               SUM(hints_used) as total_hints_used
+        FROM challenge_attempts
+        GROUP BY user_id
+    ) a ON a.user_id = u.id
+    WHERE u.username != 'admin'
+    ORDER BY u.last_activity DESC
+'''
+
+# Difficulty breakdown for every candidate at once (avoids one query per candidate)
+_SQL_ADMIN_CANDIDATE_DIFFICULTY = '''
+    SELECT u.username, c.difficulty_level, 
+           COUNT(DISTINCT ca.challenge_id) as attempted,
+           COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.challenge_id END) as completed
+    FROM users u
+    JOIN challenge_attempts ca ON u.id = ca.user_id
+    JOIN challenges c ON ca.challenge_id = c.id
+    WHERE u.username != 'admin'
+    GROUP BY u.username, c.difficulty_level
+    ORDER BY u.username, c.difficulty_level
+'''
+
 @app.route('/api/admin/candidates')
 @require_login
 def api_admin_candidates():
     """Get all candidates and their assessment summary"""
-    conn = get_user_db_connection()
-    try:
-        # Get all users who have made challenge attempts
-        candidates = conn.execute('''
-            SELECT DISTINCT u.username, u.created_at as registration_date,
-                   COUNT(DISTINCT ca.challenge_id) as challenges_attempted,
-                   COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.challenge_id END) as challenges_completed,
-                   MAX(ca.score) as best_score,
-                   SUM(ca.score) as total_score,
-                   COUNT(ca.id) as total_attempts,
-                   AVG(ca.execution_time_ms) as avg_execution_time,
-                   SUM(ca.hints_used) as total_hints_used,
-                   MAX(ca.created_at) as last_activity
-            FROM users u
-            LEFT JOIN challenge_attempts ca ON u.id = ca.user_id
-            WHERE u.username != 'admin'
-            GROUP BY u.id, u.username, u.created_at
-            ORDER BY last_activity DESC NULLS LAST
-        ''').fetchall()
-        
-        candidate_list = []
-        for candidate in candidates:
-            # Calculate completion rate
-            completion_rate = 0
-            if candidate['challenges_attempted'] > 0:
-                completion_rate = round((candidate['challenges_completed'] or 0) / candidate['challenges_attempted'] * 100, 1)
-            
-            # Get challenge difficulty breakdown
-            difficulty_stats = conn.execute('''
-                SELECT c.difficulty_level, 
-                       COUNT(DISTINCT ca.challenge_id) as attempted,
-                       COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.challenge_id END) as completed
-                FROM challenge_attempts ca
-                JOIN challenges c ON ca.challenge_id = c.id
-                JOIN users u ON ca.user_id = u.id
-                WHERE u.username = ?
-                GROUP BY c.difficulty_level
-                ORDER BY c.difficulty_level
-            ''', (candidate['username'],)).fetchall()
-            
-            candidate_data = dict(candidate)
-            candidate_data['completion_rate'] = completion_rate
-            candidate_data['difficulty_breakdown'] = [dict(stat) for stat in difficulty_stats]
-            
-            candidate_list.append(candidate_data)
+    conn = get_request_user_db()
+    # Get all users who have made challenge attempts
+    candidates = conn.execute(_SQL_ADMIN_CANDIDATES).fetchall()
+    
+    # Get challenge difficulty breakdown for all candidates in one pass
+    breakdown_by_user = defaultdict(list)
+    for stat in conn.execute(_SQL_ADMIN_CANDIDATE_DIFFICULTY):
+        breakdown_by_user[stat['username']].append({
+            'difficulty_level': stat['difficulty_level'],
+            'attempted': stat['attempted'],
+            'completed': stat['completed']
+        })
+    
+    candidate_list = []
+    for candidate in candidates:
+        candidate_data = dict(candidate)
+        candidate_data['difficulty_breakdown'] = breakdown_by_user.get(candidate['username'], [])
         
-        return jsonify(candidate_list)
-    finally:
-        conn.close()
+        candidate_list.append(candidate_data)
+    
+    return jsonify(candidate_list)
+
+# Summary figures for the candidate detail view, rounded in SQLite
+_SQL_ADMIN_CANDIDATE_SUMMARY = '''
+    WITH progress AS (
+        SELECT c.max_score,
+               COUNT(ca.id) as attempts,
+               MAX(CASE WHEN ca.is_correct = 1 THEN ca.score ELSE 0 END) as best_score,
+               MAX(ca.is_correct) as completed
+        FROM challenges c
+        LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id AND ca.user_id = :user_id
+        WHERE c.is_active = 1
+        GROUP BY c.id
+    ), totals AS (
+        SELECT COUNT(CASE WHEN attempts > 0 THEN 1 END) as total_challenges_attempted,
+               COUNT(CASE WHEN completed THEN 1 END) as completed_challenges,
+               COALESCE(SUM(best_score), 0) as total_score,
+               COALESCE(SUM(max_score), 0) as max_possible_score
+        FROM progress
+    ), attempts AS (
+        SELECT COUNT(*) as total_attempts,
+               COALESCE(ROUND(AVG(ca.execution_time_ms), 1), 0) as avg_execution_time,
+               COALESCE(SUM(ca.hints_used), 0) as total_hints_used
+        FROM challenge_attempts ca
+        JOIN challenges c ON ca.challenge_id = c.id
+        WHERE ca.user_id = :user_id
+    )
+    SELECT t.total_challenges_attempted, t.completed_challenges,
+           COALESCE(ROUND(100.0 * t.completed_challenges / NULLIF(t.total_challenges_attempted, 0), 1), 0) as completion_rate,
+           t.total_score, t.max_possible_score,
+           COALESCE(ROUND(100.0 * t.total_score / NULLIF(t.max_possible_score, 0), 1), 0) as score_percentage,
+           a.total_attempts, a.avg_execution_time, a.total_hints_used
+    FROM totals t, attempts a
+'''
 
 @app.route('/api/admin/candidate/<username>/detail')
 @require_login
 def api_admin_candidate_detail(username):
     """Get detailed candidate assessment data"""
-    conn = get_user_db_connection()
-    try:
-        # Get user ID
-        user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-        if not user:
-            return jsonify({'error': 'Candidate not found'}), 404
-        
-        user_id = user['id']
-        
-        # Get challenge progress
-        challenge_progress = conn.execute('''
-            SELECT c.id, c.title, c.difficulty_level, c.category, c.max_score,
-                   COUNT(ca.id) as attempts,
-                   MAX(CASE WHEN ca.is_correct = 1 THEN ca.score ELSE 0 END) as best_score,
-                   MAX(ca.is_correct) as completed,
-                   MIN(ca.execution_time_ms) as best_time,
-                   SUM(ca.hints_used) as total_hints,
-                   MAX(ca.created_at) as last_attempt
-            FROM challenges c
-            LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id AND ca.user_id = ?
-            WHERE c.is_active = 1
-            GROUP BY c.id, c.title, c.difficulty_level, c.category, c.max_score
-            ORDER BY c.difficulty_level, c.id
-        ''', (user_id,)).fetchall()
-        
-        # Get detailed attempt history
-        attempt_history = conn.execute('''
-            SELECT ca.id, ca.challenge_id, c.title as challenge_title, 
-                   ca.query_text, ca.is_correct, ca.score, ca.result_count,
-                   ca.execution_time_ms, ca.hints_used, ca.created_at,
-                   c.difficulty_level, c.expected_result_count
-            FROM challenge_attempts ca
-            JOIN challenges c ON ca.challenge_id = c.id
-            WHERE ca.user_id = ?
-            ORDER BY ca.created_at DESC
-        ''', (user_id,)).fetchall()
-        
-        # Calculate overall statistics
-        total_challenges = len([p for p in challenge_progress if p['attempts'] > 0])
-        completed_challenges = len([p for p in challenge_progress if p['completed']])
-        total_score = sum(p['best_score'] or 0 for p in challenge_progress)
-        max_possible_score = sum(p['max_score'] for p in challenge_progress)
-        
-        return jsonify({
-            'username': username,
-            'challenge_progress': [dict(p) for p in challenge_progress],
-            'attempt_history': [dict(a) for a in attempt_history],
-            'summary': {
-                'total_challenges_attempted': total_challenges,
-                'completed_challenges': completed_challenges,
-                'completion_rate': round(completed_challenges / total_challenges * 100, 1) if total_challenges > 0 else 0,
-                'total_score': total_score,
-                'max_possible_score': max_possible_score,
-                'score_percentage': round(total_score / max_possible_score * 100, 1) if max_possible_score > 0 else 0,
-                'total_attempts': len(attempt_history),
-                'avg_execution_time': round(sum(a['execution_time_ms'] for a in attempt_history) / len(attempt_history), 1) if attempt_history else 0,
-                'total_hints_used': sum(a['hints_used'] for a in attempt_history)
-            }
-        })
-    finally:
-        conn.close()
+    conn = get_request_user_db()
+    # Get user ID
+    user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+    if not user:
+        return jsonify({'error': 'Candidate not found'}), 404
+    
+    user_id = user['id']
+    
+    # Get challenge progress
+    challenge_progress = conn.execute('''
+        SELECT c.id, c.title, c.difficulty_level, c.category, c.max_score,
+               COUNT(ca.id) as attempts,
+               MAX(CASE WHEN ca.is_correct = 1 THEN ca.score ELSE 0 END) as best_score,
+               MAX(ca.is_correct) as completed,
+               MIN(ca.execution_time_ms) as best_time,
+               SUM(ca.hints_used) as total_hints,
+               MAX(ca.created_at) as last_attempt
+        FROM challenges c
+        LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id AND ca.user_id = ?
+        WHERE c.is_active = 1
+        GROUP BY c.id, c.title, c.difficulty_level, c.category, c.max_score
+        ORDER BY c.difficulty_level, c.id
+    ''', (user_id,))
+    challenge_progress = rows_as_dicts(challenge_progress)
+    
+    # Get detailed attempt history
+    attempt_history = conn.execute('''
+        SELECT ca.id, ca.challenge_id, c.title as challenge_title, 
+               ca.query_text, ca.is_correct, ca.score, ca.result_count,
+               ca.execution_time_ms, ca.hints_used, ca.created_at,
+               c.difficulty_level, c.expected_result_count
+        FROM challenge_attempts ca
+        JOIN challenges c ON ca.challenge_id = c.id
+        WHERE ca.user_id = ?
+        ORDER BY ca.created_at DESC
+    ''', (user_id,))
+    attempt_history = rows_as_dicts(attempt_history)
+    
+    # Calculate overall statistics
+    summary = conn.execute(_SQL_ADMIN_CANDIDATE_SUMMARY, {'user_id': user_id}).fetchone()
+    
+    return jsonify({
+        'username': username,
+        'challenge_progress': challenge_progress,
+        'attempt_history': attempt_history,
+        'summary': dict(summary)
+    })
+
+_SQL_ANALYTICS_OVERALL = '''
+    SELECT 
+        COUNT(DISTINCT u.id) as total_candidates,
+        COUNT(DISTINCT ca.challenge_id) as challenges_attempted,
+        COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.challenge_id END) as challenges_completed,
+        AVG(ca.score) as avg_score,
+        AVG(ca.execution_time_ms) as avg_execution_time,
+        COUNT(ca.id) as total_attempts
+    FROM users u
+    LEFT JOIN challenge_attempts ca ON u.id = ca.user_id
+    WHERE u.username != 'admin'
+'''
+
+_SQL_ANALYTICS_DIFFICULTY = '''
+    SELECT c.difficulty_level,
+           COUNT(DISTINCT ca.user_id) as candidates_attempted,
+           COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.user_id END) as candidates_completed,
+           AVG(ca.score) as avg_score,
+           COUNT(ca.id) as total_attempts
+    FROM challenges c
+    LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id
+    GROUP BY c.difficulty_level
+    ORDER BY c.difficulty_level
+'''
+
+_SQL_ANALYTICS_CHALLENGES = '''
+    SELECT c.title, c.difficulty_level,
+           COUNT(ca.id) as total_attempts,
+           COUNT(CASE WHEN ca.is_correct = 1 THEN 1 END) as successful_attempts,
+           AVG(ca.score) as avg_score,
+           AVG(ca.execution_time_ms) as avg_time,
+           AVG(ca.hints_used) as avg_hints
+    FROM challenges c
+    LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id
+    WHERE c.is_active = 1
+    GROUP BY c.id, c.title, c.difficulty_level
+    ORDER BY (COUNT(CASE WHEN ca.is_correct = 1 THEN 1 END) * 1.0 / NULLIF(COUNT(ca.id), 0)) ASC
+'''
 
 @app.route('/api/admin/analytics')
 @require_login
 def api_admin_analytics():
     """Get overall assessment analytics"""
-    conn = get_user_db_connection()
-    try:
-        # Overall statistics
-        overall_stats = conn.execute('''
-            SELECT 
-                COUNT(DISTINCT u.id) as total_candidates,
-                COUNT(DISTINCT ca.challenge_id) as challenges_attempted,
-                COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.challenge_id END) as challenges_completed,
-                AVG(ca.score) as avg_score,
-                AVG(ca.execution_time_ms) as avg_execution_time,
-                COUNT(ca.id) as total_attempts
-            FROM users u
-            LEFT JOIN challenge_attempts ca ON u.id = ca.user_id
-            WHERE u.username != 'admin'
-        ''').fetchone()
-        
-        # Challenge difficulty statistics
-        difficulty_stats = conn.execute('''
-            SELECT c.difficulty_level,
-                   COUNT(DISTINCT ca.user_id) as candidates_attempted,
-                   COUNT(DISTINCT CASE WHEN ca.is_correct = 1 THEN ca.user_id END) as candidates_completed,
-                   AVG(ca.score) as avg_score,
-                   COUNT(ca.id) as total_attempts
-            FROM challenges c
-            LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id
-            GROUP BY c.difficulty_level
-            ORDER BY c.difficulty_level
-        ''').fetchall()
-        
-        # Most challenging problems
-        challenge_stats = conn.execute('''
-            SELECT c.title, c.difficulty_level,
-                   COUNT(ca.id) as total_attempts,
-                   COUNT(CASE WHEN ca.is_correct = 1 THEN 1 END) as successful_attempts,
-                   AVG(ca.score) as avg_score,
-                   AVG(ca.execution_time_ms) as avg_time,
-                   AVG(ca.hints_used) as avg_hints
-            FROM challenges c
-            LEFT JOIN challenge_attempts ca ON c.id = ca.challenge_id
-            WHERE c.is_active = 1
-            GROUP BY c.id, c.title, c.difficulty_level
-            ORDER BY (COUNT(CASE WHEN ca.is_correct = 1 THEN 1 END) * 1.0 / NULLIF(COUNT(ca.id), 0)) ASC
-        ''').fetchall()
-        
-        return jsonify({
-            'overall': dict(overall_stats),
-            'difficulty_breakdown': [dict(stat) for stat in difficulty_stats],
-            'challenge_difficulty_ranking': [dict(stat) for stat in challenge_stats]
-        })
-    finally:
-        conn.close()
+    conn = get_request_user_db()
+    # Overall statistics
+    overall_stats = conn.execute(_SQL_ANALYTICS_OVERALL).fetchone()
+    
+    # Challenge difficulty statistics
+    difficulty_stats = rows_as_dicts(conn.execute(_SQL_ANALYTICS_DIFFICULTY))
+    
+    # Most challenging problems
+    challenge_stats = rows_as_dicts(conn.execute(_SQL_ANALYTICS_CHALLENGES))
+    
+    return jsonify({
+        'overall': dict(overall_stats),
+        'difficulty_breakdown': difficulty_stats,
+        'challenge_difficulty_ranking': challenge_stats
+    })
+
+_SQL_EXPORT_CANDIDATE_ATTEMPTS = '''
+    SELECT c.title, c.difficulty_level, c.category, ca.query_text, 
+           ca.is_correct, ca.score, ca.execution_time_ms, ca.hints_used,
+           ca.created_at, c.expected_result_count, ca.result_count
+    FROM challenge_attempts ca
+    JOIN challenges c ON ca.challenge_id = c.id
+    JOIN users u ON ca.user_id = u.id
+    WHERE u.username = ?
+    ORDER BY ca.created_at
+'''
 
 @app.route('/api/admin/export/candidate/<username>')
 @require_login
 def api_admin_export_candidate(username):
-    """Export candidate assessment report"""
-    conn = get_user_db_connection()
-    try:
-        # Get detailed data (reuse existing endpoint logic)
-        user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-        if not user:
-            return jsonify({'error': 'Candidate not found'}), 404
-        
-        # Generate assessment report
-        report = {
-            'candidate': username,
-            'assessment_date': datetime.now().isoformat(),
-            'challenges': [],
-            'summary': {}
-        }
-        
-        # Get challenge attempts with full details
-        attempts = conn.execute('''
-            SELECT c.title, c.difficulty_level, c.category, ca.query_text, 
-                   ca.is_correct, ca.score, ca.execution_time_ms, ca.hints_used,
-                   ca.created_at, c.expected_result_count, ca.result_count
-            FROM challenge_attempts ca
-            JOIN challenges c ON ca.challenge_id = c.id
-            JOIN users u ON ca.user_id = u.id
-            WHERE u.username = ?
-            ORDER BY ca.created_at
-        ''', (username,)).fetchall()
-        
-        for attempt in attempts:
-            report['challenges'].append({
+    """Export candidate assessment report.
+
+    The report is streamed one attempt at a time straight off the cursor so
+    prolific candidates don't need the whole attempt list (and its JSON
+    encoding) held in memory at once.
+    """
+    conn = get_request_user_db()
+    user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+    if not user:
+        return jsonify({'error': 'Candidate not found'}), 404
+    
+    def generate_report():
+        yield '{"candidate": %s, "assessment_date": %s, "challenges": [' % (
+            json.dumps(username), json.dumps(datetime.now().isoformat()))
+        
+        first = True
+        for attempt in conn.execute(_SQL_EXPORT_CANDIDATE_ATTEMPTS, (username,)):
+            if not first:
+                yield ', '
+            first = False
+            yield json.dumps({
                 'challenge': attempt['title'],
                 'difficulty': attempt['difficulty_level'],
                 'category': attempt['category'],
@@ -2079,27 +2415,35 @@ def api_admin_export_candidate(username):
                 'timestamp': attempt['created_at']
             })
         
-        return jsonify(report)
-    finally:
-        conn.close()
+        yield '], "summary": {}}'
+    
+    # stream_with_context keeps the app context (and with it the pooled
+    # connection) alive until the generator is exhausted
+    return app.response_class(stream_with_context(generate_report()), mimetype='application/json')
+
+# Question count from quiz_questions.json, re-read only when the file's mtime changes
+_quiz_questions_cache = {'mtime': None, 'count': 0}
+
+def count_quiz_questions(path='quiz_questions.json'):
+    """Number of quiz questions in the file, cached until the file is modified"""
+    mtime = os.stat(path).st_mtime
+    if mtime != _quiz_questions_cache['mtime']:
+        with open(path, 'r') as f:
+            _quiz_questions_cache['count'] = len(json.load(f))
+        _quiz_questions_cache['mtime'] = mtime
+    return _quiz_questions_cache['count']
 
 @app.route('/health')
 def health():
     """Standardized health check endpoint."""
-    import time
-    
-    start_time = getattr(app, 'start_time', time.time())
-    if not hasattr(app, 'start_time'):
-        app.start_time = start_time
-    
-    version_info = get_version_info()
+    version_info = get_cached_version_info()
     health_status = {
         'status': 'healthy',
         'service': 'sqlquiz',
         'version': version_info['version'],
         'commit': version_info['git_commit'],
         'build_date': version_info['build_date'],
-        'uptime': int(time.time() - start_time),
+        'uptime': int(time.time() - app.start_time),
         'environment': version_info['environment'],
         'checks': {}
     }
@@ -2120,10 +2464,8 @@ def health():
     
     # Optional check for quiz questions file (not required for Data Explorer)
     try:
-        with open('quiz_questions.json', 'r') as f:
-            import json
-            questions = json.load(f)
-            health_status['checks']['quiz_questions'] = f'available: {len(questions)} questions loaded'
+        question_count = count_quiz_questions()
+        health_status['checks']['quiz_questions'] = f'available: {question_count} questions loaded'
     except Exception as e:
         health_status['checks']['quiz_questions'] = f'not available: {str(e)}'
         # Don't mark as unhealthy - quiz mode is optional
@@ -2132,4 +2474,7 @@ def health():
     return jsonify(health_status), status_code
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5002)
\ No newline at end of file
+    # Handle requests concurrently so one slow query doesn't block other users.
+    # In production run under gunicorn instead, e.g.:
+    #   gunicorn -w 4 --threads 8 app_monolithic:app
+    app.run(debug=True, host='0.0.0.0', port=5002, threaded=True)
\ No newline at end of file
@@ -6,48 +6,75 @@ Loads CSV data into SQLite database
 
 import sqlite3
 import csv
+import functools
 import os
+import re
 import sys
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+from operator import itemgetter
 
 DATABASE = 'healthcare_quiz.db'
 
+# Worker processes used to convert HW_CHARGES.csv rows (1 converts inline)
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', os.cpu_count() or 1))
+# Raw rows handed to a worker at a time
+LOAD_CHUNK_SIZE = 50000
+# Rows between progress lines
+PROGRESS_INTERVAL = 10000
+
+# Values that could not be parsed and were loaded as NULL; they are tallied
+# here and reported once by report_bad_values instead of printed per cell.
+# Dates keep the distinct strings, so counts from worker processes (whose
+# parse_date caches overlap) can be merged without double counting.
+_bad_values = {'date': set(), 'decimal': 0}
+
+# Values treated as missing once surrounding whitespace is stripped
+_NULL_VALUES = frozenset(('', 'N/A', 'n/a', 'N/a', 'n/A'))
+
 def clean_value(value):
     """Clean and convert CSV values"""
-    if not value or value.strip() == '' or value.upper() == 'N/A':
-        return None
-    
-    # Remove BOM if present
-    if value.startswith('﻿'):
-        value = value[1:]
-    
-    return value.strip()
+    # Files are opened as utf-8-sig, so a BOM never reaches the values
+    value = value.strip() if value else ''
+    return None if value in _NULL_VALUES else value
 
+# Accepted date layouts - matched directly instead of through strptime, which
+# re-interprets its format string on every call
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})$')
+_US_DATE_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+# Billing exports repeat the same few thousand dates across every row, so each
+# distinct string is parsed (and warned about) only once
+@functools.lru_cache(maxsize=65536)
 def parse_date(date_str):
-    """Parse date strings from CSV"""
-    if not date_str or date_str.strip() == '' or date_str.upper() == 'N/A':
-        return None
-    
+    """Parse date strings from CSV into ISO date text"""
     date_str = clean_value(date_str)
     if not date_str:
         return None
     
+    # Dates are returned as ISO 'YYYY-MM-DD' text so they bind straight to
+    # SQLite instead of going through sqlite3's date adapter on every insert
     try:
-        # Try parsing YYYY-MM-DD format
-        return datetime.strptime(date_str, '%Y-%m-%d').date()
+        # Try parsing YYYY-MM-DD format (by far the most common)
+        match = _ISO_DATE_RE.match(date_str)
+        if match:
+            parsed = date(int(match[1]), int(match[2]), int(match[3]))
+            return date_str if len(date_str) == 10 else parsed.isoformat()
+        
+        # Try parsing MM/DD/YYYY format
+        match = _US_DATE_RE.match(date_str)
+        if match:
+            return date(int(match[3]), int(match[1]), int(match[2])).isoformat()
     except ValueError:
-        try:
-            # Try parsing MM/DD/YYYY format
-            return datetime.strptime(date_str, '%m/%d/%Y').date()
-        except ValueError:
-            print(f"Warning: Could not parse date '{date_str}', skipping...")
-            return None
+        pass  # Well-formed but impossible date, e.g. 2023-02-30
+    
+    _bad_values['date'].add(date_str)
+    return None
 
 def parse_decimal(decimal_str):
     """Parse decimal values from CSV"""
-    if not decimal_str or decimal_str.strip() == '' or decimal_str.upper() == 'N/A':
-        return None
-    
     decimal_str = clean_value(decimal_str)
     if not decimal_str:
         return None
@@ -55,7 +82,7 @@ def parse_decimal(decimal_str):
     try:
         return float(decimal_str)
     except ValueError:
-        print(f"Warning: Could not parse decimal '{decimal_str}', using NULL")
+        _bad_values['decimal'] += 1
         return None
 
 def create_database():
@@ -67,7 +94,20 @@ def create_database():
         os.remove(DATABASE)
     
     # Create new database
-    conn = sqlite3.connect(DATABASE)
+    # A larger statement cache keeps every loader statement prepared for reuse
+    conn = sqlite3.connect(DATABASE, cached_statements=256, detect_types=0)
+    
+    # Bulk-load settings: WAL with NORMAL sync avoids an fsync per commit, and
+    # nothing else touches the file while the loader holds it exclusively
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+    # References are checked once after the load (see check_foreign_keys)
+    # rather than against the parent index on every insert
+    conn.execute("PRAGMA foreign_keys=OFF")
     
     # Read and execute schema
     with open('schema.sql', 'r') as f:
@@ -79,308 +119,403 @@ def create_database():
     print("Database created successfully!")
     return conn
 
-def load_lookup_tables(conn):
-    """Load lookup tables first"""
-    print("Loading lookup tables...")
+def create_indexes(conn):
+    """Create indexes once the tables are loaded"""
+    print("Creating indexes...")
     
-    # Service lines - extract from invoice data
-    service_lines = set()
-    
-    # Read service lines from invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            service_line = clean_value(row.get('SERVICE_LINE'))
-            if service_line:
-                service_lines.add(service_line)
-    
-    # Insert service lines
-    for service_line in service_lines:
-        conn.execute("""
-            INSERT OR IGNORE INTO service_lines (service_line_code, service_line_name)
-            VALUES (?, ?)
-        """, (service_line, service_line))
-    
-    # Insurance plans - extract from both CSV files
-    insurance_plans = set()
-    
-    # From invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Current plan
-            plan_code = clean_value(row.get('CUR_IPLAN_CODE'))
-            plan_desc = clean_value(row.get('CUR_IPLAN_DESC'))
-            payor = clean_value(row.get('CUR_PAYOR'))
-            if plan_code:
-                insurance_plans.add((plan_code, plan_desc, payor))
-            
-            # Primary plan
-            plan_code = clean_value(row.get('IPLAN_1_CODE'))
-            plan_desc = clean_value(row.get('IPLAN_1_DESC'))
-            payor = clean_value(row.get('IPLAN_1_PAYOR'))
-            if plan_code:
-                insurance_plans.add((plan_code, plan_desc, payor))
-    
-    # From charges CSV
-    with open('HW_CHARGES.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Current plan
-            plan_code = clean_value(row.get('CUR_IPLAN_CODE'))
-            plan_desc = clean_value(row.get('CUR_IPLAN_DESC'))
-            payor = clean_value(row.get('CUR_PAYOR'))
-            if plan_code:
-                insurance_plans.add((plan_code, plan_desc, payor))
-            
-            # Primary plan
-            plan_code = clean_value(row.get('IPLAN_1_CODE'))
-            plan_desc = clean_value(row.get('IPLAN_1_DESC'))
-            payor = clean_value(row.get('IPLAN_1_PAYOR'))
-            if plan_code:
-                insurance_plans.add((plan_code, plan_desc, payor))
-            
-            # Invoice plan
-            plan_code = clean_value(row.get('INV_IPLAN_CODE'))
-            plan_desc = clean_value(row.get('INV_IPLAN_DESC'))
-            payor = clean_value(row.get('INV_IPLAN_PAYOR'))
-            if plan_code:
-                insurance_plans.add((plan_code, plan_desc, payor))
-    
-    # Insert insurance plans
-    for plan_code, plan_desc, payor in insurance_plans:
-        conn.execute("""
-            INSERT OR IGNORE INTO insurance_plans (plan_code, plan_description, payor_name)
-            VALUES (?, ?, ?)
-        """, (plan_code, plan_desc, payor))
+    # Building each index in one sorted pass is far cheaper than updating
+    # every index B-tree on each insert during the load
+    with open('schema_indexes.sql', 'r') as f:
+        indexes = f.read()
     
+    conn.executescript(indexes)
     conn.commit()
-    print(f"Loaded {len(service_lines)} service lines and {len(insurance_plans)} insurance plans")
+    
+    print("Indexes created successfully!")
+
 
-def load_patients(conn):
-    """Load patient data"""
-    print("Loading patient data...")
+# Large read buffer so csv.reader pulls the file in megabyte chunks
+CSV_READ_BUFFER_SIZE = 1 << 20
+
+
+def read_csv_columns(path, columns):
+    """Yield a tuple of the named columns' values for every row of a CSV file.
+
+    Rows come from csv.reader and are picked apart with a single itemgetter,
+    so no per-row dict is built. Columns missing from the file (or from a
+    short row) come back as None, the same as csv.DictReader. The file is
+    streamed through a large buffer, so memory stays flat however big it is.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='', buffering=CSV_READ_BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        width = len(header)
+        positions = {name: i for i, name in enumerate(header)}
+        
+        # Index `width` is a None pad appended to each row for absent columns
+        getter = itemgetter(*[positions.get(name, width) for name in columns])
+        if len(columns) == 1:
+            single = getter
+            getter = lambda row: (single(row),)
+        padding = [None] * width
+        
+        for row in reader:
+            if not row:
+                continue  # DictReader skips blank lines too
+            if len(row) == width:
+                row.append(None)
+            else:
+                # Drop any fields past the header so index `width` is always the pad
+                row = (row + padding)[:width] + [None]
+            yield getter(row)
+
+
+# Columns read for the lookup tables, in the order they are unpacked
+INVOICE_LOOKUP_COLUMNS = (
+    'SERVICE_LINE',
+    'CUR_IPLAN_CODE', 'CUR_IPLAN_DESC', 'CUR_PAYOR',
+    'IPLAN_1_CODE', 'IPLAN_1_DESC', 'IPLAN_1_PAYOR',
+)
+CHARGES_LOOKUP_COLUMNS = (
+    'CUR_IPLAN_CODE', 'CUR_IPLAN_DESC', 'CUR_PAYOR',
+    'IPLAN_1_CODE', 'IPLAN_1_DESC', 'IPLAN_1_PAYOR',
+    'INV_IPLAN_CODE', 'INV_IPLAN_DESC', 'INV_IPLAN_PAYOR',
+)
+
+# Raw lookup columns are staged in temp tables and deduplicated by SQLite,
+# rather than hashed into Python sets
+STAGING_TABLES_SQL = """
+    CREATE TEMP TABLE staging_invoice_lookups (
+        service_line,
+        cur_code, cur_desc, cur_payor,
+        primary_code, primary_desc, primary_payor
+    );
+    CREATE TEMP TABLE staging_charges_lookups (
+        cur_code, cur_desc, cur_payor,
+        primary_code, primary_desc, primary_payor,
+        invoice_code, invoice_desc, invoice_payor
+    );
+"""
+
+STAGE_INVOICE_LOOKUPS_SQL = "INSERT INTO temp.staging_invoice_lookups VALUES (?, ?, ?, ?, ?, ?, ?)"
+STAGE_CHARGES_LOOKUPS_SQL = "INSERT INTO temp.staging_charges_lookups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+SERVICE_LINE_INSERT_SQL = """
+    INSERT OR IGNORE INTO service_lines (service_line_code, service_line_name)
+    SELECT DISTINCT service_line, service_line
+    FROM temp.staging_invoice_lookups
+    WHERE service_line IS NOT NULL
+"""
+
+# Current and primary plans from both files, plus the charges' invoice plan
+INSURANCE_PLAN_INSERT_SQL = """
+    INSERT OR IGNORE INTO insurance_plans (plan_code, plan_description, payor_name)
+    SELECT DISTINCT plan_code, plan_desc, payor FROM (
+        SELECT cur_code AS plan_code, cur_desc AS plan_desc, cur_payor AS payor FROM temp.staging_invoice_lookups
+        UNION ALL
+        SELECT primary_code, primary_desc, primary_payor FROM temp.staging_invoice_lookups
+        UNION ALL
+        SELECT cur_code, cur_desc, cur_payor FROM temp.staging_charges_lookups
+        UNION ALL
+        SELECT primary_code, primary_desc, primary_payor FROM temp.staging_charges_lookups
+        UNION ALL
+        SELECT invoice_code, invoice_desc, invoice_payor FROM temp.staging_charges_lookups
+    )
+    WHERE plan_code IS NOT NULL
+"""
+
+def _cleaned_rows(rows):
+    """Apply clean_value to every value of every row"""
+    clean = clean_value
+    for values in rows:
+        yield [clean(value) for value in values]
+
+def load_lookup_tables(conn):
+    """Load lookup tables first"""
+    print("Loading lookup tables...")
     
-    patients = set()
+    conn.executescript(STAGING_TABLES_SQL)
+    conn.execute("BEGIN")
     
-    # Extract unique patients from invoice CSV
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            patient_id = clean_value(row.get('NEW_PT_ID'))
-            dob = parse_date(row.get('PAT_DOB'))
-            billing_office = clean_value(row.get('BILLING_OFFICE'))
-            
-            if patient_id:
-                patients.add((patient_id, dob, billing_office))
-    
-    # Insert patients
-    for patient_id, dob, billing_office in patients:
-        conn.execute("""
-            INSERT OR IGNORE INTO patients (patient_id, date_of_birth, billing_office)
-            VALUES (?, ?, ?)
-        """, (patient_id, dob, billing_office))
+    # Stage the lookup columns of both CSV files
+    conn.executemany(STAGE_INVOICE_LOOKUPS_SQL,
+                     _cleaned_rows(read_csv_columns('HW_INVOICE.csv', INVOICE_LOOKUP_COLUMNS)))
+    conn.executemany(STAGE_CHARGES_LOOKUPS_SQL,
+                     _cleaned_rows(read_csv_columns('HW_CHARGES.csv', CHARGES_LOOKUP_COLUMNS)))
+    
+    # Insert the distinct service lines and insurance plans
+    service_line_count = conn.execute(SERVICE_LINE_INSERT_SQL).rowcount
+    insurance_plan_count = conn.execute(INSURANCE_PLAN_INSERT_SQL).rowcount
     
     conn.commit()
-    print(f"Loaded {len(patients)} patients")
+    conn.executescript("DROP TABLE temp.staging_invoice_lookups; DROP TABLE temp.staging_charges_lookups;")
+    print(f"Loaded {service_line_count} service lines and {insurance_plan_count} insurance plans")
 
-def load_invoices(conn):
-    """Load invoice header data"""
-    print("Loading invoice data...")
-    
+PATIENT_INSERT_SQL = """
+    INSERT OR IGNORE INTO patients (patient_id, date_of_birth, billing_office)
+    VALUES (?, ?, ?)
+"""
+
+INVOICE_INSERT_SQL = """
+    INSERT OR REPLACE INTO invoices (
+        invoice_id, patient_id, billing_center, source_system, ar_status,
+        invoice_post_date, invoice_open_date, service_start_date, service_end_date,
+        service_line_code, invoice_total_charges, invoice_total_balance,
+        invoice_ins_balance, invoice_bad_debt_balance, invoice_total_payments,
+        invoice_total_ins_payments, invoice_total_pt_payments, invoice_total_adjustments,
+        invoice_total_expected_reimbursement, current_plan_code, primary_plan_code,
+        secondary_plan_code, zero_balance_date, bad_debt_transfer_date,
+        first_bill_date, last_payment_date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# (CSV column, converter) for each invoices column, in INVOICE_INSERT_SQL order
+INVOICE_FIELDS = (
+    ('NEW_INVOICE_ID', clean_value),
+    ('NEW_PT_ID', clean_value),
+    ('NEW_BILLING_CENTER', clean_value),
+    ('NEW_SOURCE_SYSTEM', clean_value),
+    ('AR_STATUS', clean_value),
+    
+    # Dates
+    ('INVOICE_POST_DATE', parse_date),
+    ('INVOICE_OPEN_DATE', parse_date),
+    ('SERVICE_START_DATE', parse_date),
+    ('SERVICE_END_DATE', parse_date),
+    
+    # Service line
+    ('SERVICE_LINE', clean_value),
+    
+    # Financial amounts
+    ('INVOICE_TOTAL_CHARGES', parse_decimal),
+    ('TOTAL_CURRENT_BALANCE', parse_decimal),
+    ('INVOICE_INS_BALANCE', parse_decimal),
+    ('TOTAL_BAD_DEBT_BALANCE', parse_decimal),
+    ('INVOICE_TOTAL_PAYMENTS', parse_decimal),
+    ('INVOICE_TOTAL_INS_PAYMENTS', parse_decimal),
+    ('INVOICE_TOTAL_PT_PAYMENTS', parse_decimal),
+    ('INVOICE_TOTAL_ADJUSTMENTS', parse_decimal),
+    ('INVOICE_TOTAL_EXPECTED_REIMBURSEMENT', parse_decimal),
+    
+    # Insurance plans
+    ('CUR_IPLAN_CODE', clean_value),
+    ('IPLAN_1_CODE', clean_value),
+    ('IPLAN_2_CODE', clean_value),
+    
+    # More dates
+    ('ZERO_BALANCE_DATE', parse_date),
+    ('BAD_DEBT_TRANSFER_DATE', parse_date),
+    ('FIRST_BILL_DATE', parse_date),
+    ('INVOICE_LAST_PAYMENT_DATE', parse_date),
+)
+
+def report_progress(count, label):
+    """Write a progress line for a row loop"""
+    sys.stdout.write(f"  Processed {count} {label}...\n")
+    sys.stdout.flush()
+
+def report_bad_values():
+    """Print how many values could not be parsed and were loaded as NULL"""
+    if _bad_values['date']:
+        print(f"Warning: {len(_bad_values['date'])} distinct unparseable dates loaded as NULL")
+    if _bad_values['decimal']:
+        print(f"Warning: {_bad_values['decimal']} unparseable decimals loaded as NULL")
+
+def _converted_rows(rows, fields, label):
+    """Convert raw CSV values with each field's converter, skipping rows without an ID.
+
+    The first field is the row's ID and must be present; progress is printed
+    as rows are yielded unless label is None. Each row is built as a single
+    list straight from the raw values, and any values beyond the fields
+    (extra columns read for other purposes) are ignored.
+    """
+    converters = [converter for _, converter in fields]
     count = 0
-    with open('HW_INVOICE.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
+    for values in rows:
+        row = [convert(value) for convert, value in zip(converters, values)]
+        if not row[0]:
+            continue
         
-        for row in reader:
-            invoice_id = clean_value(row.get('NEW_INVOICE_ID'))
-            if not invoice_id:
-                continue
-            
-            # Extract and clean data
-            patient_id = clean_value(row.get('NEW_PT_ID'))
-            billing_center = clean_value(row.get('NEW_BILLING_CENTER'))
-            source_system = clean_value(row.get('NEW_SOURCE_SYSTEM'))
-            ar_status = clean_value(row.get('AR_STATUS'))
-            
-            # Dates
-            invoice_post_date = parse_date(row.get('INVOICE_POST_DATE'))
-            invoice_open_date = parse_date(row.get('INVOICE_OPEN_DATE'))
-            service_start_date = parse_date(row.get('SERVICE_START_DATE'))
-            service_end_date = parse_date(row.get('SERVICE_END_DATE'))
-            zero_balance_date = parse_date(row.get('ZERO_BALANCE_DATE'))
-            bad_debt_transfer_date = parse_date(row.get('BAD_DEBT_TRANSFER_DATE'))
-            first_bill_date = parse_date(row.get('FIRST_BILL_DATE'))
-            last_payment_date = parse_date(row.get('INVOICE_LAST_PAYMENT_DATE'))
-            
-            # Financial amounts
-            invoice_total_charges = parse_decimal(row.get('INVOICE_TOTAL_CHARGES'))
-            invoice_total_balance = parse_decimal(row.get('TOTAL_CURRENT_BALANCE'))
-            invoice_ins_balance = parse_decimal(row.get('INVOICE_INS_BALANCE'))
-            invoice_bad_debt_balance = parse_decimal(row.get('TOTAL_BAD_DEBT_BALANCE'))
-            invoice_total_payments = parse_decimal(row.get('INVOICE_TOTAL_PAYMENTS'))
-            invoice_total_ins_payments = parse_decimal(row.get('INVOICE_TOTAL_INS_PAYMENTS'))
-            invoice_total_pt_payments = parse_decimal(row.get('INVOICE_TOTAL_PT_PAYMENTS'))
-            invoice_total_adjustments = parse_decimal(row.get('INVOICE_TOTAL_ADJUSTMENTS'))
-            invoice_total_expected_reimbursement = parse_decimal(row.get('INVOICE_TOTAL_EXPECTED_REIMBURSEMENT'))
-            
-            # Service line
-            service_line_code = clean_value(row.get('SERVICE_LINE'))
-            
-            # Insurance plans
-            current_plan_code = clean_value(row.get('CUR_IPLAN_CODE'))
-            primary_plan_code = clean_value(row.get('IPLAN_1_CODE'))
-            secondary_plan_code = clean_value(row.get('IPLAN_2_CODE'))
-            
-            try:
-                conn.execute("""
-                    INSERT OR REPLACE INTO invoices (
-                        invoice_id, patient_id, billing_center, source_system, ar_status,
-                        invoice_post_date, invoice_open_date, service_start_date, service_end_date,
-                        service_line_code, invoice_total_charges, invoice_total_balance,
-                        invoice_ins_balance, invoice_bad_debt_balance, invoice_total_payments,
-                        invoice_total_ins_payments, invoice_total_pt_payments, invoice_total_adjustments,
-                        invoice_total_expected_reimbursement, current_plan_code, primary_plan_code,
-                        secondary_plan_code, zero_balance_date, bad_debt_transfer_date,
-                        first_bill_date, last_payment_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    invoice_id, patient_id, billing_center, source_system, ar_status,
-                    invoice_post_date, invoice_open_date, service_start_date, service_end_date,
-                    service_line_code, invoice_total_charges, invoice_total_balance,
-                    invoice_ins_balance, invoice_bad_debt_balance, invoice_total_payments,
-                    invoice_total_ins_payments, invoice_total_pt_payments, invoice_total_adjustments,
-                    invoice_total_expected_reimbursement, current_plan_code, primary_plan_code,
-                    secondary_plan_code, zero_balance_date, bad_debt_transfer_date,
-                    first_bill_date, last_payment_date
-                ))
-                count += 1
-                
-                if count % 100 == 0:
-                    print(f"  Processed {count} invoices...")
-                    
-            except Exception as e:
-                print(f"Error inserting invoice {invoice_id}: {e}")
+        yield row
+        
+        count += 1
+        if label is not None and count % PROGRESS_INTERVAL == 0:
+            report_progress(count, label)
+
+def _convert_chunk(rows, fields):
+    """Convert one chunk of raw CSV rows (runs in a worker process).
+
+    Returns the converted rows and the chunk's bad values, which the parent
+    merges into its own.
+    """
+    _bad_values['date'] = set()
+    _bad_values['decimal'] = 0
+    converted = list(_converted_rows(rows, fields, None))
+    return converted, dict(_bad_values)
+
+def _add_bad_values(bad_values):
+    """Merge a worker's bad values into this process's tallies"""
+    _bad_values['date'] |= bad_values['date']
+    _bad_values['decimal'] += bad_values['decimal']
+
+def _parallel_converted_rows(rows, fields, label, workers):
+    """Convert raw CSV rows across worker processes, yielding them in file order.
+
+    Chunks are submitted a few at a time so memory stays bounded, and results
+    are consumed in submission order so later rows still replace earlier ones.
+    """
+    chunks = iter(lambda: list(islice(rows, LOAD_CHUNK_SIZE)), [])
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_convert_chunk, chunk, fields))
+            if len(pending) < workers * 2:
                 continue
+            converted, bad_values = pending.popleft().result()
+            count += len(converted)
+            report_progress(count, label)
+            _add_bad_values(bad_values)
+            yield from converted
+        
+        while pending:
+            converted, bad_values = pending.popleft().result()
+            count += len(converted)
+            report_progress(count, label)
+            _add_bad_values(bad_values)
+            yield from converted
+
+def load_invoice_file(conn):
+    """Load patients and invoice headers from a single pass over the invoice CSV"""
+    print("Loading patient and invoice data...")
+    
+    # First billing office / date of birth seen for each patient
+    patients = {}
+    
+    def collect_patients(rows):
+        # Every row names a patient, including rows without an invoice ID, so
+        # patients are picked up before the invoice rows are filtered
+        for values in rows:
+            patient_id = clean_value(values[1])
+            if patient_id and patient_id not in patients:
+                patients[patient_id] = (patient_id, parse_date(values[-2]), clean_value(values[-1]))
+            yield values  # The trailing patient columns are ignored by _converted_rows
+    
+    columns = [column for column, _ in INVOICE_FIELDS] + ['PAT_DOB', 'BILLING_OFFICE']
+    rows = collect_patients(read_csv_columns('HW_INVOICE.csv', columns))
+    
+    # One explicit transaction for the whole file so rows aren't journaled one by one
+    conn.execute("BEGIN")
+    # executemany binds and steps every row inside the sqlite3 C loop
+    cursor = conn.executemany(INVOICE_INSERT_SQL, _converted_rows(rows, INVOICE_FIELDS, 'invoices'))
+    invoice_count = cursor.rowcount
+    conn.executemany(PATIENT_INSERT_SQL, patients.values())
     
     conn.commit()
-    print(f"Loaded {count} invoices")
+    print(f"Loaded {len(patients)} patients")
+    print(f"Loaded {invoice_count} invoices")
+
+INVOICE_DETAIL_INSERT_SQL = """
+    INSERT OR REPLACE INTO invoice_details (
+        invoice_detail_id, invoice_id, patient_id, billing_center, billing_office,
+        order_id, cpt_code, catalog_code, service_start_date, service_end_date,
+        invoice_total_charges, charge_quantity, invoice_total_expected_reimbursement,
+        current_plan_code, current_plan_desc, current_payor, primary_plan_code,
+        primary_plan_desc, primary_payor, invoice_plan_code, invoice_plan_desc,
+        invoice_payor, claim_bill_date, last_bill_date, first_bill_date,
+        invoice_open_date, invoice_detail_post_date, payer_order, physician_ordering_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# (CSV column, converter) for each invoice_details column, in INVOICE_DETAIL_INSERT_SQL order
+INVOICE_DETAIL_FIELDS = (
+    ('NEW_INVOICE_DETAIL_ID', clean_value),
+    ('NEW_INVOICE_ID', clean_value),
+    ('NEW_PT_ID', clean_value),
+    ('NEW_BILLING_CENTER', clean_value),
+    ('BILLING_OFFICE', clean_value),
+    ('ORDER_ID', clean_value),
+    
+    # Service codes
+    ('CPT_CODE', clean_value),
+    ('CATALOG_CODE', clean_value),
+    ('SERVICE_START_DATE', parse_date),
+    ('SERVICE_END_DATE', parse_date),
+    
+    # Financial amounts
+    ('INVOICE_TOTAL_CHARGES', parse_decimal),
+    ('CHARGE_QUANTITY', parse_decimal),
+    ('INVOICE_TOTAL_EXPECTED_REIMBURSEMENT', parse_decimal),
+    
+    # Insurance information
+    ('CUR_IPLAN_CODE', clean_value),
+    ('CUR_IPLAN_DESC', clean_value),
+    ('CUR_PAYOR', clean_value),
+    ('IPLAN_1_CODE', clean_value),
+    ('IPLAN_1_DESC', clean_value),
+    ('IPLAN_1_PAYOR', clean_value),
+    ('INV_IPLAN_CODE', clean_value),
+    ('INV_IPLAN_DESC', clean_value),
+    ('INV_IPLAN_PAYOR', clean_value),
+    
+    # Dates
+    ('CLAIM_BILL_DATE', parse_date),
+    ('LAST_BILL_DATE', parse_date),
+    ('FIRST_BILL_DATE', parse_date),
+    ('INVOICE_OPEN_DATE', parse_date),
+    ('INVOICE_DETAIL_POST_DATE', parse_date),
+    
+    # Other fields
+    ('PAYER_ORDER', clean_value),
+    ('PHYSICIAN_ORDERING_ID', clean_value),
+)
 
 def load_invoice_details(conn):
     """Load invoice detail data"""
     print("Loading invoice detail data...")
     
-    count = 0
-    with open('HW_CHARGES.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            invoice_detail_id = clean_value(row.get('NEW_INVOICE_DETAIL_ID'))
-            if not invoice_detail_id:
-                continue
-            
-            # Extract and clean data
-            invoice_id = clean_value(row.get('NEW_INVOICE_ID'))
-            patient_id = clean_value(row.get('NEW_PT_ID'))
-            billing_center = clean_value(row.get('NEW_BILLING_CENTER'))
-            billing_office = clean_value(row.get('BILLING_OFFICE'))
-            order_id = clean_value(row.get('ORDER_ID'))
-            
-            # Service codes
-            cpt_code = clean_value(row.get('CPT_CODE'))
-            catalog_code = clean_value(row.get('CATALOG_CODE'))
-            
-            # Dates
-            service_start_date = parse_date(row.get('SERVICE_START_DATE'))
-            service_end_date = parse_date(row.get('SERVICE_END_DATE'))
-            claim_bill_date = parse_date(row.get('CLAIM_BILL_DATE'))
-            last_bill_date = parse_date(row.get('LAST_BILL_DATE'))
-            first_bill_date = parse_date(row.get('FIRST_BILL_DATE'))
-            invoice_open_date = parse_date(row.get('INVOICE_OPEN_DATE'))
-            invoice_detail_post_date = parse_date(row.get('INVOICE_DETAIL_POST_DATE'))
-            
-            # Financial amounts
-            invoice_total_charges = parse_decimal(row.get('INVOICE_TOTAL_CHARGES'))
-            charge_quantity = parse_decimal(row.get('CHARGE_QUANTITY'))
-            invoice_total_expected_reimbursement = parse_decimal(row.get('INVOICE_TOTAL_EXPECTED_REIMBURSEMENT'))
-            
-            # Insurance information
-            current_plan_code = clean_value(row.get('CUR_IPLAN_CODE'))
-            current_plan_desc = clean_value(row.get('CUR_IPLAN_DESC'))
-            current_payor = clean_value(row.get('CUR_PAYOR'))
-            primary_plan_code = clean_value(row.get('IPLAN_1_CODE'))
-            primary_plan_desc = clean_value(row.get('IPLAN_1_DESC'))
-            primary_payor = clean_value(row.get('IPLAN_1_PAYOR'))
-            invoice_plan_code = clean_value(row.get('INV_IPLAN_CODE'))
-            invoice_plan_desc = clean_value(row.get('INV_IPLAN_DESC'))
-            invoice_payor = clean_value(row.get('INV_IPLAN_PAYOR'))
-            
-            # Other fields
-            payer_order = clean_value(row.get('PAYER_ORDER'))
-            physician_ordering_id = clean_value(row.get('PHYSICIAN_ORDERING_ID'))
-            
-            try:
-                conn.execute("""
-                    INSERT OR REPLACE INTO invoice_details (
-                        invoice_detail_id, invoice_id, patient_id, billing_center, billing_office,
-                        order_id, cpt_code, catalog_code, service_start_date, service_end_date,
-                        invoice_total_charges, charge_quantity, invoice_total_expected_reimbursement,
-                        current_plan_code, current_plan_desc, current_payor, primary_plan_code,
-                        primary_plan_desc, primary_payor, invoice_plan_code, invoice_plan_desc,
-                        invoice_payor, claim_bill_date, last_bill_date, first_bill_date,
-                        invoice_open_date, invoice_detail_post_date, payer_order, physician_ordering_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    invoice_detail_id, invoice_id, patient_id, billing_center, billing_office,
-                    order_id, cpt_code, catalog_code, service_start_date, service_end_date,
-                    invoice_total_charges, charge_quantity, invoice_total_expected_reimbursement,
-                    current_plan_code, current_plan_desc, current_payor, primary_plan_code,
-                    primary_plan_desc, primary_payor, invoice_plan_code, invoice_plan_desc,
-                    invoice_payor, claim_bill_date, last_bill_date, first_bill_date,
-                    invoice_open_date, invoice_detail_post_date, payer_order, physician_ordering_id
-                ))
-                count += 1
-                
-                if count % 100 == 0:
-                    print(f"  Processed {count} invoice details...")
-                    
-            except Exception as e:
-                print(f"Error inserting invoice detail {invoice_detail_id}: {e}")
-                continue
+    # One explicit transaction for the whole file so rows aren't journaled one by one
+    conn.execute("BEGIN")
+    rows = read_csv_columns('HW_CHARGES.csv', [column for column, _ in INVOICE_DETAIL_FIELDS])
+    # Value conversion is the CPU-heavy part, so spread it over worker
+    # processes while this process does the (single-writer) inserts
+    if LOAD_WORKERS > 1:
+        converted = _parallel_converted_rows(rows, INVOICE_DETAIL_FIELDS, 'invoice details', LOAD_WORKERS)
+    else:
+        converted = _converted_rows(rows, INVOICE_DETAIL_FIELDS, 'invoice details')
+    # executemany binds and steps every row inside the sqlite3 C loop
+    cursor = conn.executemany(INVOICE_DETAIL_INSERT_SQL, converted)
     
     conn.commit()
-    print(f"Loaded {count} invoice details")
+    print(f"Loaded {cursor.rowcount} invoice details")
+
+SUMMARY_STATS_SQL = """
+    SELECT (SELECT COUNT(*) FROM patients),
+           (SELECT COUNT(*) FROM invoices),
+           (SELECT COUNT(*) FROM invoice_details),
+           (SELECT COUNT(*) FROM insurance_plans),
+           (SELECT COUNT(*) FROM service_lines),
+           (SELECT COALESCE(SUM(invoice_total_charges), 0) FROM invoices),
+           (SELECT COALESCE(SUM(invoice_total_payments), 0) FROM invoices)
+"""
 
 def create_summary_stats(conn):
     """Create some summary statistics"""
     print("Creating summary statistics...")
     
-    stats = {}
+    # All counts and totals in one statement
+    (patients, invoices, invoice_details, insurance_plans, service_lines,
+     total_charges, total_payments) = conn.execute(SUMMARY_STATS_SQL).fetchone()
     
-    # Count records
-    cursor = conn.execute("SELECT COUNT(*) FROM patients")
-    stats['patients'] = cursor.fetchone()[0]
-    
-    cursor = conn.execute("SELECT COUNT(*) FROM invoices")
-    stats['invoices'] = cursor.fetchone()[0]
-    
-    cursor = conn.execute("SELECT COUNT(*) FROM invoice_details")
-    stats['invoice_details'] = cursor.fetchone()[0]
-    
-    cursor = conn.execute("SELECT COUNT(*) FROM insurance_plans")
-    stats['insurance_plans'] = cursor.fetchone()[0]
-    
-    cursor = conn.execute("SELECT COUNT(*) FROM service_lines")
-    stats['service_lines'] = cursor.fetchone()[0]
-    
-    # Financial totals
-    cursor = conn.execute("SELECT SUM(invoice_total_charges) FROM invoices WHERE invoice_total_charges IS NOT NULL")
-    total_charges = cursor.fetchone()[0] or 0
-    stats['total_charges'] = total_charges
-    
-    cursor = conn.execute("SELECT SUM(invoice_total_payments) FROM invoices WHERE invoice_total_payments IS NOT NULL")
-    total_payments = cursor.fetchone()[0] or 0
-    stats['total_payments'] = total_payments
+    stats = {
+        'patients': patients,
+        'invoices': invoices,
+        'invoice_details': invoice_details,
+        'insurance_plans': insurance_plans,
+        'service_lines': service_lines,
+        'total_charges': total_charges,
+        'total_payments': total_payments,
+    }
     
     print("\n=== DATABASE SUMMARY ===")
     print(f"Patients: {stats['patients']:,}")
@@ -397,6 +532,23 @@ def create_summary_stats(conn):
     
     print("========================\n")
 
+def check_foreign_keys(conn):
+    """Re-enable foreign keys and report any references the load left dangling"""
+    print("Checking foreign keys...")
+    conn.execute("PRAGMA foreign_keys=ON")
+    
+    violations = {}
+    for table, _, parent, _ in conn.execute("PRAGMA foreign_key_check"):
+        key = (table, parent)
+        violations[key] = violations.get(key, 0) + 1
+    
+    if not violations:
+        print("All foreign key references are valid")
+        return
+    
+    for (table, parent), count in sorted(violations.items()):
+        print(f"Warning: {count} rows in {table} reference missing {parent} rows")
+
 def main():
     """Main data loading function"""
     print("SQLQuiz Data Loader - Healthcare Database")
@@ -415,15 +567,23 @@ def main():
         print("Error: schema.sql not found!")
         sys.exit(1)
     
+    if not os.path.exists('schema_indexes.sql'):
+        print("Error: schema_indexes.sql not found!")
+        sys.exit(1)
+    
     try:
         # Create database
         conn = create_database()
         
         # Load data in order
         load_lookup_tables(conn)
-        load_patients(conn)
-        load_invoices(conn)
+        load_invoice_file(conn)
         load_invoice_details(conn)
+        report_bad_values()
+        check_foreign_keys(conn)
+        
+        # Index the loaded data
+        create_indexes(conn)
         
         # Create summary
         create_summary_stats(conn)
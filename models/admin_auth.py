@@ -5,6 +5,7 @@ Handles admin user authentication via OAuth providers like Google, Microsoft, et
 
 import os
 import secrets
+import time
 from urllib.parse import urlencode
 from functools import wraps
 from flask import session, request, redirect, url_for, flash, current_app
@@ -93,21 +94,22 @@ def create_admin_session(user_id, email, name=None):
             # Generate session token
             session_token = secrets.token_urlsafe(32)
             
-            # Create session with admin flag
-            conn.execute('''
-                INSERT INTO user_sessions (
-                    user_id, session_token, login_time, last_activity,
-                    ip_address, user_agent, is_admin
-                )
-                VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, 1)
-            ''', (user_id, session_token, request.remote_addr, request.headers.get('User-Agent', '')))
-            
-            # Update user last login
-            conn.execute('''
-                UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?
-            ''', (user_id,))
+            # Session insert and last-login update commit together (one fsync)
+            with conn:
+                # Create session with admin flag
+                conn.execute('''
+                    INSERT INTO user_sessions (
+                        user_id, session_token, login_time, last_activity,
+                        ip_address, user_agent, is_admin
+                    )
+                    VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, 1)
+                ''', (user_id, session_token, request.remote_addr, request.headers.get('User-Agent', '')))
+                
+                # Update user last login
+                conn.execute('''
+                    UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (user_id,))
             
-            conn.commit()
             return session_token
         finally:
             conn.close()
@@ -116,8 +118,28 @@ def create_admin_session(user_id, email, name=None):
         return None
 
 
+# Validated admin sessions, kept for ADMIN_SESSION_CACHE_TTL seconds so admin
+# page views don't each SELECT and UPDATE the user database
+ADMIN_SESSION_CACHE_TTL = 60
+_admin_session_cache = {}  # session_token -> (admin user dict, time validated)
+
+
+def _cache_admin_session(session_token, admin_user, now):
+    """Remember a validated admin session, dropping expired entries when the cache grows"""
+    if len(_admin_session_cache) >= 1024:
+        for token, (_, validated_at) in list(_admin_session_cache.items()):
+            if now - validated_at >= ADMIN_SESSION_CACHE_TTL:
+                _admin_session_cache.pop(token, None)
+    _admin_session_cache[session_token] = (admin_user, now)
+
+
 def get_admin_by_session(session_token):
     """Get admin user information from session token"""
+    now = time.monotonic()
+    cached = _admin_session_cache.get(session_token)
+    if cached and now - cached[1] < ADMIN_SESSION_CACHE_TTL:
+        return dict(cached[0])
+    
     try:
         conn = get_user_db_connection()
         try:
@@ -129,15 +151,20 @@ def get_admin_by_session(session_token):
             ''', (session_token,)).fetchone()
             
             if result:
-                # Update last activity
-                conn.execute('''
-                    UPDATE user_sessions 
-                    SET last_activity = CURRENT_TIMESTAMP 
-                    WHERE session_token = ?
-                ''', (session_token,))
-                conn.commit()
+                # Update last activity - only on a cache miss, so at most
+                # once per ADMIN_SESSION_CACHE_TTL for an active session
+                with conn:
+                    conn.execute('''
+                        UPDATE user_sessions 
+                        SET last_activity = CURRENT_TIMESTAMP 
+                        WHERE session_token = ?
+                    ''', (session_token,))
                 
-                return dict(result)
+                admin_user = dict(result)
+                _cache_admin_session(session_token, admin_user, now)
+                return dict(admin_user)
+            
+            _admin_session_cache.pop(session_token, None)
             return None
         finally:
             conn.close()
@@ -180,6 +207,7 @@ def require_admin(f):
 
 def invalidate_admin_session(session_token):
     """Invalidate admin session"""
+    _admin_session_cache.pop(session_token, None)
     try:
         conn = get_user_db_connection()
         try:
@@ -3,441 +3,584 @@ Candidate invitation and activity tracking module.
 Handles unique URL generation, candidate authentication, and comprehensive activity logging.
 """
 
+import atexit
+import logging
+import os
+import queue
 import sqlite3
 import secrets
-import string
-from datetime import datetime, timedelta, timezone
-from models.database import get_user_db_connection
-from utils.timezone import utc_now, format_for_display
+import threading
+import time
+from datetime import datetime, timezone
+from models.database import pooled_conn, rows_as_dicts
+from utils.timezone import utc_timestamp, utc_from_timestamp, format_for_display
 from flask import request, session
 
+logger = logging.getLogger(__name__)
+
 
 def generate_invitation_token(length=32):
     """Generate a cryptographically secure invitation token"""
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+    # One token_urlsafe call instead of a secrets.choice per character; its
+    # '-' and '_' are mapped onto letters to keep tokens alphanumeric
+    token = secrets.token_urlsafe(length * 3 // 4 + 3)
+    return token.replace('-', 'A').replace('_', 'B')[:length]
+
+
+# Re-inviting an email replaces its invitation in place. This is an upsert on
+# email rather than INSERT OR REPLACE so that a clash on invitation_token
+# raises IntegrityError instead of silently replacing another invitation.
+_INVITATION_UPSERT_SQL = '''
+    INSERT INTO candidate_invitations 
+    (email, candidate_name, invitation_token, created_by, expires_at, is_active)
+    VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT(email) DO UPDATE SET
+        candidate_name = excluded.candidate_name,
+        invitation_token = excluded.invitation_token,
+        created_by = excluded.created_by,
+        created_at = CURRENT_TIMESTAMP,
+        expires_at = excluded.expires_at,
+        is_used = 0,
+        used_at = NULL,
+        is_active = 1
+    RETURNING id
+'''
 
 
 def create_candidate_invitation(email, candidate_name, created_by_user_id, expires_days=30):
     """Create a new candidate invitation with unique URL token"""
-    conn = get_user_db_connection()
     try:
-        # Generate unique token
-        token = generate_invitation_token()
-        
-        # Check if token already exists (highly unlikely but good practice)
-        while conn.execute("SELECT id FROM candidate_invitations WHERE invitation_token = ?", (token,)).fetchone():
+        with pooled_conn(write=True) as conn, conn:
+            # Set expiration date (UTC), straight from the epoch clock
+            expires_at = utc_from_timestamp(utc_timestamp() + expires_days * 86400) if expires_days else None
+            
+            # Create invitation; the UNIQUE index on invitation_token catches the
+            # (astronomically unlikely) duplicate token, so it isn't pre-checked
             token = generate_invitation_token()
-        
-        # Set expiration date (UTC)
-        expires_at = utc_now() + timedelta(days=expires_days) if expires_days else None
-        
-        # Create invitation
-        cursor = conn.execute('''
-            INSERT OR REPLACE INTO candidate_invitations 
-            (email, candidate_name, invitation_token, created_by, expires_at, is_active)
-            VALUES (?, ?, ?, ?, ?, 1)
-        ''', (email, candidate_name, token, created_by_user_id, expires_at))
-        
-        invitation_id = cursor.lastrowid
-        conn.commit()
-        
-        return {
-            'success': True,
-            'invitation_id': invitation_id,
-            'token': token,
-            'expires_at': expires_at,
-            'unique_url': f"/candidate/{token}"
-        }
+            try:
+                row = conn.execute(_INVITATION_UPSERT_SQL, (email, candidate_name, token, created_by_user_id, expires_at)).fetchone()
+            except sqlite3.IntegrityError:
+                token = generate_invitation_token()
+                row = conn.execute(_INVITATION_UPSERT_SQL, (email, candidate_name, token, created_by_user_id, expires_at)).fetchone()
+            
+            invitation_id = row['id']
+            # A re-issued invitation replaces the old token's cached entry
+            _invitation_cache.clear()
+            return {
+                'success': True,
+                'invitation_id': invitation_id,
+                'token': token,
+                'expires_at': expires_at,
+                'unique_url': f"/candidate/{token}"
+            }
     except Exception as e:
-        conn.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        conn.close()
 
 
-def validate_invitation_token(token):
-    """Validate an invitation token and return candidate info if valid"""
-    conn = get_user_db_connection()
-    try:
-        invitation = conn.execute('''
-            SELECT * FROM candidate_invitations 
-            WHERE invitation_token = ? AND is_active = 1
-        ''', (token,)).fetchone()
-        
-        if not invitation:
-            return {'valid': False, 'error': 'Invalid or expired invitation'}
-        
-        # Check if expired
-        if invitation['expires_at']:
-            expires_at = datetime.fromisoformat(invitation['expires_at'])
-            # Ensure expires_at is timezone-aware (UTC)
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-            if utc_now() > expires_at:
-                return {'valid': False, 'error': 'Invitation has expired'}
-        
+def _check_invitation(conn, token):
+    """Look up an active, unexpired invitation by token on conn"""
+    # Expiry is filtered by SQLite itself (naive timestamps count as UTC), so
+    # a valid token is one indexed lookup returning one row
+    invitation = conn.execute('''
+        SELECT * FROM candidate_invitations 
+        WHERE invitation_token = ? AND is_active = 1
+          AND (expires_at IS NULL OR julianday(expires_at) >= julianday('now'))
+    ''', (token,)).fetchone()
+    
+    if invitation:
         return {
             'valid': True,
             'invitation': dict(invitation)
         }
-    except Exception as e:
-        return {'valid': False, 'error': str(e)}
-    finally:
-        conn.close()
+    
+    # Slow path: only a rejected token pays for telling expired from unknown
+    if conn.execute('''
+        SELECT 1 FROM candidate_invitations WHERE invitation_token = ? AND is_active = 1
+    ''', (token,)).fetchone():
+        return {'valid': False, 'error': 'Invitation has expired'}
+    return {'valid': False, 'error': 'Invalid or expired invitation'}
+
+
+# Valid invitations, kept for INVITATION_CACHE_TTL seconds so repeat visits
+# to a candidate URL don't each look the token up. Re-issuing or deactivating
+# an invitation clears the cache, and a login evicts its token (in this
+# process; others age out).
+INVITATION_CACHE_TTL = 30
+_invitation_cache = {}  # token -> (invitation dict, expiry epoch or None, time cached)
+
+
+def _invitation_expiry_epoch(expires_at):
+    """Return an invitation's expires_at as epoch seconds (naive values are UTC)"""
+    if not expires_at:
+        return None
+    expires = datetime.fromisoformat(expires_at)
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires.timestamp()
+
+
+def _cache_invitation(token, invitation, now):
+    """Remember a valid invitation, dropping stale entries when the cache grows"""
+    if len(_invitation_cache) >= 1024:
+        for cached_token, (_, _, cached_at) in list(_invitation_cache.items()):
+            if now - cached_at >= INVITATION_CACHE_TTL:
+                _invitation_cache.pop(cached_token, None)
+    _invitation_cache[token] = (invitation, _invitation_expiry_epoch(invitation['expires_at']), now)
+
+
+def validate_invitation_token(token):
+    """Validate an invitation token and return candidate info if valid"""
+    now = time.monotonic()
+    cached = _invitation_cache.get(token)
+    if cached and now - cached[2] < INVITATION_CACHE_TTL:
+        # A cached invitation can still expire while cached
+        if cached[1] is None or utc_timestamp() <= cached[1]:
+            return {'valid': True, 'invitation': dict(cached[0])}
+        _invitation_cache.pop(token, None)
+    
+    with pooled_conn() as conn:
+        try:
+            validation = _check_invitation(conn, token)
+        except Exception as e:
+            return {'valid': False, 'error': str(e)}
+    
+    if validation['valid']:
+        _cache_invitation(token, dict(validation['invitation']), now)
+    return validation
+
+
+_SESSION_INSERT_SQL = '''
+    INSERT INTO user_sessions 
+    (user_id, session_token, ip_address, user_agent, is_admin, is_active)
+    VALUES (?, ?, ?, ?, 0, 1)
+'''
 
 
 def authenticate_candidate(token):
-    """Authenticate candidate and create session"""
-    validation = validate_invitation_token(token)
-    if not validation['valid']:
-        return validation
+    """Authenticate candidate and create session.
     
-    invitation = validation['invitation']
-    conn = get_user_db_connection()
+    The user, session and invitation writes are committed together, so a
+    login costs a single commit.
+    """
+    # Read the request details once rather than through the proxy per use
+    ip_address = request.remote_addr
+    user_agent = request.headers.get('User-Agent')
     
     try:
-        # Check if user already exists for this invitation
-        user = conn.execute('''
-            SELECT * FROM users WHERE email = ?
-        ''', (invitation['email'],)).fetchone()
-        
-        if user:
-            user_id = user['id']
-        else:
-            # Create new user for this candidate with unique username if needed
-            base_username = invitation['candidate_name']
-            username = base_username
-            counter = 1
+        with pooled_conn(write=True) as conn:
+            # The invitation is read on the same connection as the writes below
+            validation = _check_invitation(conn, token)
+            if not validation['valid']:
+                return validation
+            invitation = validation['invitation']
             
-            # Ensure username is unique
-            while conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
-                username = f"{base_username}_{counter}"
-                counter += 1
+            # User, session and invitation updates commit together (or not at all)
+            with conn:
+                # Check if user already exists for this invitation
+                user = conn.execute('''
+                    SELECT * FROM users WHERE email = ?
+                ''', (invitation['email'],)).fetchone()
+                
+                if user:
+                    user_id = user['id']
+                else:
+                    # Create new user for this candidate with unique username if needed
+                    base_username = invitation['candidate_name']
+                    username = base_username
+                    counter = 1
+                    
+                    # Ensure username is unique
+                    while conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
+                        username = f"{base_username}_{counter}"
+                        counter += 1
+                    
+                    cursor = conn.execute('''
+                        INSERT INTO users (username, email, is_admin, is_active)
+                        VALUES (?, ?, 0, 1)
+                    ''', (username, invitation['email']))
+                    user_id = cursor.lastrowid
+                
+                # Generate session token
+                session_token = generate_invitation_token()
+                
+                # Create session
+                conn.execute(_SESSION_INSERT_SQL, (user_id, session_token, ip_address, user_agent))
+                
+                # Mark invitation as used along with the session it created
+                if not invitation['is_used']:
+                    conn.execute('''
+                        UPDATE candidate_invitations 
+                        SET is_used = 1, used_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (invitation['id'],))
+            
+            # The committed login changed is_used; drop the stale cached invitation
+            _invitation_cache.pop(token, None)
+            
+            # Log candidate login activity once the login has been committed
+            log_candidate_activity(
+                user_id=user_id,
+                invitation_token=token,
+                activity_type='candidate_login',
+                details=f"Candidate {invitation['candidate_name']} logged in via invitation",
+                ip_address=ip_address,
+                user_agent=user_agent,
+                page_url=request.url
+            )
+            
+            return {
+                'success': True,
+                'user_id': user_id,
+                'session_token': session_token,
+                'candidate_name': invitation['candidate_name'],
+                'email': invitation['email']
+            }
             
-            cursor = conn.execute('''
-                INSERT INTO users (username, email, is_admin, is_active)
-                VALUES (?, ?, 0, 1)
-            ''', (username, invitation['email']))
-            user_id = cursor.lastrowid
-        
-        # Generate session token
-        session_token = generate_invitation_token()
-        
-        # Create session
-        conn.execute('''
-            INSERT INTO user_sessions 
-            (user_id, session_token, ip_address, user_agent, is_admin, is_active)
-            VALUES (?, ?, ?, ?, 0, 1)
-        ''', (user_id, session_token, request.remote_addr, request.headers.get('User-Agent')))
-        
-        # Log candidate login activity
-        log_candidate_activity(
-            user_id=user_id,
-            invitation_token=token,
-            activity_type='candidate_login',
-            details=f"Candidate {invitation['candidate_name']} logged in via invitation",
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            page_url=request.url
-        )
-        
-        conn.commit()
-        
-        # Mark invitation as used only AFTER successful authentication and session creation
-        if not invitation['is_used']:
-            conn.execute('''
-                UPDATE candidate_invitations 
-                SET is_used = 1, used_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (invitation['id'],))
-            conn.commit()
-        
-        return {
-            'success': True,
-            'user_id': user_id,
-            'session_token': session_token,
-            'candidate_name': invitation['candidate_name'],
-            'email': invitation['email']
-        }
-        
     except Exception as e:
-        conn.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        conn.close()
+
+
+# Activity rows are queued and written in batches by a background thread, so
+# logging costs the request a queue put instead of an insert and a commit
+ACTIVITY_FLUSH_BATCH_SIZE = 256
+ACTIVITY_FLUSH_INTERVAL = 0.05  # seconds to keep gathering a batch
+
+_ACTIVITY_INSERT_SQL = '''
+    INSERT INTO candidate_activity_log 
+    (user_id, invitation_token, activity_type, details, query_text, 
+     execution_time_ms, success, error_message, ip_address, user_agent, 
+     page_url, session_duration_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_activity_queue = queue.Queue()
+_activity_flusher_pid = None
+_activity_flusher_lock = threading.Lock()
+
+
+def _write_activity_batch(batch):
+    """Insert a batch of queued activity rows with a single commit"""
+    try:
+        with pooled_conn(write=True) as conn, conn:
+            conn.executemany(_ACTIVITY_INSERT_SQL, batch)
+    except Exception as e:
+        logger.error("Failed to log %d candidate activities: %s", len(batch), e)
+
+
+def _activity_flusher():
+    """Background loop that drains the activity queue in batches"""
+    while True:
+        batch = [_activity_queue.get()]
+        deadline = time.monotonic() + ACTIVITY_FLUSH_INTERVAL
+        while len(batch) < ACTIVITY_FLUSH_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_activity_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write_activity_batch(batch)
+        for _ in batch:
+            _activity_queue.task_done()
+
+
+def _start_activity_flusher():
+    """Start this process's flusher thread if it is not running yet"""
+    global _activity_flusher_pid
+    with _activity_flusher_lock:
+        # Threads don't survive a fork, so each gunicorn worker starts its own
+        if _activity_flusher_pid != os.getpid():
+            threading.Thread(target=_activity_flusher, name='candidate-activity-flusher',
+                             daemon=True).start()
+            _activity_flusher_pid = os.getpid()
+
+
+def flush_candidate_activity():
+    """Write any queued activity rows now (also run at interpreter exit)"""
+    batch = []
+    while True:
+        try:
+            batch.append(_activity_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _write_activity_batch(batch)
+        for _ in batch:
+            _activity_queue.task_done()
+    
+    # Wait for any batch the flusher thread has already taken off the queue
+    _activity_queue.join()
+
+
+atexit.register(flush_candidate_activity)
 
 
 def log_candidate_activity(user_id=None, invitation_token=None, activity_type=None, 
                          details=None, query_text=None, execution_time_ms=None, 
                          success=None, error_message=None, ip_address=None, 
                          user_agent=None, page_url=None, session_duration_ms=None):
-    """Log comprehensive candidate activity"""
-    print(f"DEBUG - log_candidate_activity called: user_id={user_id}, activity_type={activity_type}, details={details}")
+    """Queue comprehensive candidate activity for logging"""
+    logger.debug("log_candidate_activity called: user_id=%s activity_type=%s details=%s",
+                 user_id, activity_type, details)
     
     if not user_id:
-        print("WARNING - log_candidate_activity: user_id is None, skipping logging")
+        logger.warning("log_candidate_activity: user_id is None, skipping logging")
         return
     
-    conn = get_user_db_connection()
-    try:
-        cursor = conn.execute('''
-            INSERT INTO candidate_activity_log 
-            (user_id, invitation_token, activity_type, details, query_text, 
-             execution_time_ms, success, error_message, ip_address, user_agent, 
-             page_url, session_duration_ms)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, invitation_token, activity_type, details, query_text,
-              execution_time_ms, success, error_message, ip_address, user_agent,
-              page_url, session_duration_ms))
-        conn.commit()
-        print(f"DEBUG - Successfully logged activity for user {user_id}, row_id={cursor.lastrowid}")
-    except Exception as e:
-        print(f"ERROR - Failed to log candidate activity: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+    _start_activity_flusher()
+    _activity_queue.put((user_id, invitation_token, activity_type, details, query_text,
+                         execution_time_ms, success, error_message, ip_address, user_agent,
+                         page_url, session_duration_ms))
 
 
-def get_all_candidate_invitations():
-    """Get all candidate invitations for admin interface"""
-    conn = get_user_db_connection()
-    try:
-        invitations = conn.execute('''
-            SELECT ci.*, u_creator.username as created_by_name, u_target.id as target_user_id
-            FROM candidate_invitations ci
-            JOIN users u_creator ON ci.created_by = u_creator.id
-            LEFT JOIN users u_target ON ci.email = u_target.email
-            ORDER BY ci.created_at DESC
-        ''').fetchall()
-        
-        return [dict(invitation) for invitation in invitations]
-    except Exception as e:
-        print(f"Error getting invitations: {e}")
-        return []
-    finally:
-        conn.close()
+def get_all_candidate_invitations(limit=100, before_created_at=None, before_id=None):
+    """Get one page of candidate invitations for admin interface, newest first.
+    
+    Pages are keyset-paginated: pass the created_at and id of the last
+    invitation on the previous page to get the ones that follow it.
+    """
+    with pooled_conn() as conn:
+        try:
+            cursor = conn.execute('''
+                SELECT ci.*, u_creator.username as created_by_name, u_target.id as target_user_id
+                FROM candidate_invitations ci
+                JOIN users u_creator ON ci.created_by = u_creator.id
+                LEFT JOIN users u_target ON ci.email = u_target.email
+                WHERE :before_created_at IS NULL
+                   OR (ci.created_at, ci.id) < (:before_created_at, :before_id)
+                ORDER BY ci.created_at DESC, ci.id DESC
+                LIMIT :limit
+            ''', {'before_created_at': before_created_at, 'before_id': before_id, 'limit': limit})
+            
+            return rows_as_dicts(cursor)
+        except Exception as e:
+            print(f"Error getting invitations: {e}")
+            return []
+
+
+# Activity log reads, kept as constants so the pooled connections' statement
+# caches hit on every call
+_ACTIVITY_BY_USER_SQL = '''
+    SELECT * FROM candidate_activity_log 
+    WHERE user_id = ? 
+    ORDER BY timestamp DESC 
+    LIMIT ?
+'''
+
+_ACTIVITY_BY_TOKEN_SQL = '''
+    SELECT * FROM candidate_activity_log 
+    WHERE invitation_token = ? 
+    ORDER BY timestamp DESC 
+    LIMIT ?
+'''
+
+_ACTIVITY_RECENT_SQL = '''
+    SELECT * FROM candidate_activity_log 
+    ORDER BY timestamp DESC 
+    LIMIT ?
+'''
+
+
+def _get_candidate_activity_log(conn, user_id=None, invitation_token=None, limit=100):
+    """Fetch candidate activity log rows on an already open connection"""
+    if user_id:
+        cursor = conn.execute(_ACTIVITY_BY_USER_SQL, (user_id, limit))
+    elif invitation_token:
+        cursor = conn.execute(_ACTIVITY_BY_TOKEN_SQL, (invitation_token, limit))
+    else:
+        cursor = conn.execute(_ACTIVITY_RECENT_SQL, (limit,))
+    
+    return rows_as_dicts(cursor)
 
 
 def get_candidate_activity_log(user_id=None, invitation_token=None, limit=100):
     """Get candidate activity log"""
-    conn = get_user_db_connection()
-    try:
-        if user_id:
-            activities = conn.execute('''
-                SELECT * FROM candidate_activity_log 
-                WHERE user_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (user_id, limit)).fetchall()
-        elif invitation_token:
-            activities = conn.execute('''
-                SELECT * FROM candidate_activity_log 
-                WHERE invitation_token = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (invitation_token, limit)).fetchall()
-        else:
-            activities = conn.execute('''
-                SELECT * FROM candidate_activity_log 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (limit,)).fetchall()
-        
-        return [dict(activity) for activity in activities]
-    except Exception as e:
-        print(f"Error getting activity log: {e}")
-        return []
-    finally:
-        conn.close()
+    with pooled_conn() as conn:
+        try:
+            return _get_candidate_activity_log(conn, user_id, invitation_token, limit)
+        except Exception as e:
+            print(f"Error getting activity log: {e}")
+            return []
 
 
 def deactivate_invitation(invitation_id):
     """Deactivate a candidate invitation"""
-    conn = get_user_db_connection()
     try:
-        conn.execute('''
-            UPDATE candidate_invitations 
-            SET is_active = 0 
-            WHERE id = ?
-        ''', (invitation_id,))
-        conn.commit()
-        return {'success': True}
+        with pooled_conn(write=True) as conn, conn:
+            conn.execute('''
+                UPDATE candidate_invitations 
+                SET is_active = 0 
+                WHERE id = ?
+            ''', (invitation_id,))
+            _invitation_cache.clear()
+            return {'success': True}
     except Exception as e:
-        conn.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        conn.close()
+
+
+_INVITATION_BY_EMAIL_SQL = '''
+    SELECT candidate_name, invitation_token, expires_at, is_used
+    FROM candidate_invitations WHERE email = ?
+    LIMIT 1
+'''
 
 
 def get_candidate_summary(user_id):
     """Get comprehensive summary of candidate activity and performance"""
-    conn = get_user_db_connection()
-    try:
-        # Get user info
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-        if not user:
+    with pooled_conn() as conn:
+        try:
+            # Get user info
+            user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+            if not user:
+                return None
+            
+            # Get invitation info (a probe of the UNIQUE(email) index, reading
+            # only the columns the summary needs)
+            invitation = conn.execute(_INVITATION_BY_EMAIL_SQL, (user['email'],)).fetchone()
+            
+            # Get activity summary and query attempts in one pass over the log
+            activity = conn.execute('''
+                SELECT COUNT(*) as total,
+                       COALESCE(SUM(CASE WHEN activity_type = 'query_executed' THEN 1 ELSE 0 END), 0) as queries
+                FROM candidate_activity_log WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+            activity_count = activity['total']
+            query_attempts = activity['queries']
+            
+            # Get challenge progress
+            challenge_progress = rows_as_dicts(conn.execute('''
+                SELECT * FROM user_challenge_progress WHERE user_id = ?
+            ''', (user_id,)))
+            
+            # Get recent activity
+            recent_activity = _get_candidate_activity_log(conn, user_id=user_id, limit=20)
+            
+            return {
+                'user': dict(user),
+                'invitation': dict(invitation) if invitation else None,
+                'activity_count': activity_count,
+                'query_attempts': query_attempts,
+                'challenge_progress': challenge_progress,
+                'recent_activity': recent_activity
+            }
+            
+        except Exception as e:
+            print(f"Error getting candidate summary: {e}")
             return None
-        
-        # Get invitation info
-        invitation = conn.execute('''
-            SELECT * FROM candidate_invitations WHERE email = ?
-        ''', (user['email'],)).fetchone()
-        
-        # Get activity summary
-        activity_count = conn.execute('''
-            SELECT COUNT(*) as total FROM candidate_activity_log WHERE user_id = ?
-        ''', (user_id,)).fetchone()['total']
-        
-        # Get query attempts
-        query_attempts = conn.execute('''
-            SELECT COUNT(*) as total FROM candidate_activity_log 
-            WHERE user_id = ? AND activity_type = 'query_executed'
-        ''', (user_id,)).fetchone()['total']
-        
-        # Get challenge progress
-        challenge_progress = conn.execute('''
-            SELECT * FROM user_challenge_progress WHERE user_id = ?
-        ''', (user_id,)).fetchall()
-        
-        # Get recent activity
-        recent_activity = get_candidate_activity_log(user_id=user_id, limit=20)
-        
-        return {
-            'user': dict(user),
-            'invitation': dict(invitation) if invitation else None,
-            'activity_count': activity_count,
-            'query_attempts': query_attempts,
-            'challenge_progress': [dict(cp) for cp in challenge_progress],
-            'recent_activity': recent_activity
-        }
-        
-    except Exception as e:
-        print(f"Error getting candidate summary: {e}")
-        return None
-    finally:
-        conn.close()
 
 
 def start_impersonation(admin_user_id, target_user_id):
     """Start impersonating a candidate user (admin only)"""
-    conn = get_user_db_connection()
+    # Read the request details once rather than through the proxy per use
+    ip_address = request.remote_addr
+    user_agent = request.headers.get('User-Agent')
+    
     try:
-        # Get target user info
-        target_user = conn.execute('SELECT * FROM users WHERE id = ?', (target_user_id,)).fetchone()
-        if not target_user:
-            return {'success': False, 'error': 'Target user not found'}
-        
-        # Get admin user info
-        admin_user = conn.execute('SELECT * FROM users WHERE id = ? AND is_admin = 1', (admin_user_id,)).fetchone()
-        if not admin_user:
-            return {'success': False, 'error': 'Only admins can impersonate users'}
-        
-        # Generate impersonation session token
-        impersonation_token = generate_invitation_token()
-        
-        # Create impersonation session record
-        conn.execute('''
-            INSERT INTO user_sessions 
-            (user_id, session_token, ip_address, user_agent, is_admin, is_active, 
-             impersonated_by, impersonation_start_time)
-            VALUES (?, ?, ?, ?, 0, 1, ?, CURRENT_TIMESTAMP)
-        ''', (target_user_id, impersonation_token, request.remote_addr, 
-              request.headers.get('User-Agent'), admin_user_id))
-        
-        # Log impersonation start
-        log_candidate_activity(
-            user_id=target_user_id,
-            activity_type='impersonation_started',
-            details=f"Admin {admin_user['username']} ({admin_user['email']}) started impersonating user",
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            page_url=request.url
-        )
-        
-        conn.commit()
-        
-        return {
-            'success': True,
-            'impersonation_token': impersonation_token,
-            'target_user': dict(target_user),
-            'admin_user': dict(admin_user)
-        }
-        
+        with pooled_conn(write=True) as conn, conn:
+            # Get target user info
+            target_user = conn.execute('SELECT * FROM users WHERE id = ?', (target_user_id,)).fetchone()
+            if not target_user:
+                return {'success': False, 'error': 'Target user not found'}
+            
+            # Get admin user info
+            admin_user = conn.execute('SELECT * FROM users WHERE id = ? AND is_admin = 1', (admin_user_id,)).fetchone()
+            if not admin_user:
+                return {'success': False, 'error': 'Only admins can impersonate users'}
+            
+            # Generate impersonation session token
+            impersonation_token = generate_invitation_token()
+            
+            # Create impersonation session record
+            conn.execute('''
+                INSERT INTO user_sessions 
+                (user_id, session_token, ip_address, user_agent, is_admin, is_active, 
+                 impersonated_by, impersonation_start_time)
+                VALUES (?, ?, ?, ?, 0, 1, ?, CURRENT_TIMESTAMP)
+            ''', (target_user_id, impersonation_token, ip_address, user_agent, admin_user_id))
+            
+            # Log impersonation start
+            log_candidate_activity(
+                user_id=target_user_id,
+                activity_type='impersonation_started',
+                details=f"Admin {admin_user['username']} ({admin_user['email']}) started impersonating user",
+                ip_address=ip_address,
+                user_agent=user_agent,
+                page_url=request.url
+            )
+            
+            return {
+                'success': True,
+                'impersonation_token': impersonation_token,
+                'target_user': dict(target_user),
+                'admin_user': dict(admin_user)
+            }
+            
     except Exception as e:
-        conn.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        conn.close()
 
 
 def end_impersonation(session_token):
     """End impersonation session"""
-    conn = get_user_db_connection()
     try:
-        # Get impersonation session
-        session = conn.execute('''
-            SELECT * FROM user_sessions 
-            WHERE session_token = ? AND impersonated_by IS NOT NULL
-        ''', (session_token,)).fetchone()
-        
-        if not session:
-            return {'success': False, 'error': 'No active impersonation session found'}
-        
-        # Get admin and target user info
-        admin_user = conn.execute('SELECT * FROM users WHERE id = ?', (session['impersonated_by'],)).fetchone()
-        target_user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
+        with pooled_conn(write=True) as conn, conn:
+            # Get impersonation session with its admin and target users in one query
+            session = conn.execute('''
+                SELECT us.user_id, us.impersonated_by,
+                       u_admin.username as admin_username, u_admin.email as admin_email,
+                       u_target.username as target_username, u_target.email as target_email
+                FROM user_sessions us
+                JOIN users u_admin ON us.impersonated_by = u_admin.id
+                JOIN users u_target ON us.user_id = u_target.id
+                WHERE us.session_token = ? AND us.impersonated_by IS NOT NULL
+            ''', (session_token,)).fetchone()
+            
+            if not session:
+                return {'success': False, 'error': 'No active impersonation session found'}
+            
+            # Deactivate impersonation session
+            conn.execute('''
+                UPDATE user_sessions 
+                SET is_active = 0, impersonation_end_time = CURRENT_TIMESTAMP
+                WHERE session_token = ?
+            ''', (session_token,))
         
         # Log impersonation end
         log_candidate_activity(
             user_id=session['user_id'],
             activity_type='impersonation_ended',
-            details=f"Admin {admin_user['username']} ({admin_user['email']}) ended impersonation session",
+            details=f"Admin {session['admin_username']} ({session['admin_email']}) ended impersonation session",
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent')
         )
         
-        # Deactivate impersonation session
-        conn.execute('''
-            UPDATE user_sessions 
-            SET is_active = 0, impersonation_end_time = CURRENT_TIMESTAMP
-            WHERE session_token = ?
-        ''', (session_token,))
-        
-        conn.commit()
-        
         return {
             'success': True,
-            'admin_user': dict(admin_user),
-            'target_user': dict(target_user)
+            'admin_user': {'id': session['impersonated_by'], 'username': session['admin_username'], 'email': session['admin_email']},
+            'target_user': {'id': session['user_id'], 'username': session['target_username'], 'email': session['target_email']}
         }
         
     except Exception as e:
-        conn.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        conn.close()
 
 
 def get_impersonation_info(session_token):
     """Get information about current impersonation session"""
-    conn = get_user_db_connection()
-    try:
-        session = conn.execute('''
-            SELECT us.*, u_admin.username as admin_username, u_admin.email as admin_email,
-                   u_target.username as target_username, u_target.email as target_email
-            FROM user_sessions us
-            LEFT JOIN users u_admin ON us.impersonated_by = u_admin.id
-            LEFT JOIN users u_target ON us.user_id = u_target.id
-            WHERE us.session_token = ? AND us.impersonated_by IS NOT NULL AND us.is_active = 1
-        ''', (session_token,)).fetchone()
-        
-        if session:
-            return dict(session)
-        return None
-        
-    except Exception as e:
-        print(f"Error getting impersonation info: {e}")
-        return None
-    finally:
-        conn.close()
\ No newline at end of file
+    with pooled_conn() as conn:
+        try:
+            session = conn.execute('''
+                SELECT us.*, u_admin.username as admin_username, u_admin.email as admin_email,
+                       u_target.username as target_username, u_target.email as target_email
+                FROM user_sessions us
+                LEFT JOIN users u_admin ON us.impersonated_by = u_admin.id
+                LEFT JOIN users u_target ON us.user_id = u_target.id
+                WHERE us.session_token = ? AND us.impersonated_by IS NOT NULL AND us.is_active = 1
+            ''', (session_token,)).fetchone()
+            
+            if session:
+                return dict(session)
+            return None
+            
+        except Exception as e:
+            print(f"Error getting impersonation info: {e}")
+            return None
\ No newline at end of file
@@ -4,8 +4,13 @@ Handles database setup, schema creation, and connection management.
 """
 
 import sqlite3
+import functools
 import os
+import queue
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
 # Database configuration
@@ -24,13 +29,190 @@ def get_db_connection():
     return conn
 
 
+def rows_as_dicts(cursor):
+    """Convert a cursor's rows to dicts, looking the column names up only once"""
+    # dict(sqlite3.Row) resolves every key by name per row; zipping the
+    # description's names with the plain values avoids that
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+# User databases already switched to WAL (journal_mode is persistent, so once per file)
+_wal_user_databases = set()
+
+
 def get_user_db_connection():
     """Get connection to user tracking database (internal only)"""
     conn = sqlite3.connect(USER_DATABASE)
+    return _configure_user_db_connection(conn)
+
+
+def _configure_user_db_connection(conn):
+    """Apply the user database row factory and pragmas to a new connection"""
     conn.row_factory = sqlite3.Row
+    
+    # WAL + NORMAL sync: one fsync per checkpoint instead of per commit
+    if USER_DATABASE not in _wal_user_databases:
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+            _wal_user_databases.add(USER_DATABASE)
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not enable WAL for {USER_DATABASE}: {e}")
+    conn.execute('PRAGMA synchronous = NORMAL')
+    if SQL_PROFILE:
+        conn.set_trace_callback(_count_statement)
     return conn
 
 
+# Long-lived user database connections. Reads borrow from a small pool and
+# writes share one writer connection, so writers never race each other for
+# the database lock and nothing is reopened per request.
+USER_DB_POOL_SIZE = 8
+
+_user_db_pool = None
+_user_db_writer = None
+_user_db_writer_depth = 0
+_user_db_pool_pid = None
+_user_db_pool_lock = threading.Lock()
+_user_db_writer_lock = threading.RLock()
+
+
+def _open_pooled_user_db_connection():
+    """Open a user database connection that can be shared between threads"""
+    # A long-lived connection keeps its prepared statements; the larger cache
+    # holds every statement the models issue
+    conn = sqlite3.connect(USER_DATABASE, check_same_thread=False, cached_statements=256)
+    _configure_user_db_connection(conn)
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = -64000')
+    # Log-heavy tables: checkpoint the WAL every ~1000 pages and read pages
+    # through a memory map instead of read() calls
+    conn.execute('PRAGMA wal_autocheckpoint = 1000')
+    conn.execute('PRAGMA mmap_size = 268435456')
+    return conn
+
+
+def _current_user_db_pool():
+    """Return this process's reader pool, starting a fresh one after a fork"""
+    global _user_db_pool, _user_db_writer, _user_db_pool_pid
+    with _user_db_pool_lock:
+        # SQLite connections must not be shared across gunicorn's forked
+        # workers, so each process opens its own
+        if _user_db_pool_pid != os.getpid():
+            _user_db_pool = queue.LifoQueue(maxsize=USER_DB_POOL_SIZE)
+            _user_db_writer = None
+            _user_db_pool_pid = os.getpid()
+        return _user_db_pool
+
+
+@contextmanager
+def pooled_conn(write=False):
+    """Borrow a long-lived user database connection.
+    
+    Use write=True for anything that modifies the database; those calls are
+    serialized on the single writer connection (nested calls on the same
+    thread reuse it). The connection is returned on exit rather than closed,
+    and any transaction left uncommitted is rolled back.
+    """
+    global _user_db_writer, _user_db_writer_depth
+    pool = _current_user_db_pool()
+    
+    if write:
+        with _user_db_writer_lock:
+            if _user_db_writer is None:
+                _user_db_writer = _open_pooled_user_db_connection()
+            conn = _user_db_writer
+            _user_db_writer_depth += 1
+            try:
+                yield conn
+            finally:
+                _user_db_writer_depth -= 1
+                if _user_db_writer_depth == 0 and conn.in_transaction:
+                    conn.rollback()
+        return
+    
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_pooled_user_db_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+# Opt-in profiling (SQL_PROFILE=true). User database connections count the
+# statements they run, and @profiled functions record wall time against the
+# CPU time of their own thread: CPU close to wall means the call is bound by
+# Python/VDBE work, a large gap means it waited on disk or locks.
+SQL_PROFILE = os.getenv('SQL_PROFILE', 'False').lower() == 'true'
+_profile_log = deque(maxlen=500)
+_profile_state = threading.local()
+
+
+def _count_statement(statement):
+    """Trace callback: count a statement against the profiled call in progress"""
+    counts = getattr(_profile_state, 'counts', None)
+    if counts is not None:
+        counts[0] += 1
+
+
+def profiled(func):
+    """Record each call's wall time, CPU time and statement count when SQL_PROFILE is set"""
+    if not SQL_PROFILE:
+        return func
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_profile_state, 'counts', None)
+        counts = _profile_state.counts = [0]
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            _profile_state.counts = outer
+            if outer is not None:
+                outer[0] += counts[0]
+            _profile_log.append((func.__qualname__, wall_ms, cpu_ms, counts[0]))
+    
+    return wrapper
+
+
+def get_query_profile():
+    """Summarize the recorded profiles per function, slowest average first"""
+    totals = {}
+    for name, wall_ms, cpu_ms, statements in list(_profile_log):
+        entry = totals.setdefault(name, [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += wall_ms
+        entry[2] += cpu_ms
+        entry[3] += statements
+    
+    summary = []
+    for name, (calls, wall_ms, cpu_ms, statements) in totals.items():
+        cpu_share = cpu_ms / wall_ms if wall_ms > 0 else 0
+        summary.append({
+            'function': name,
+            'calls': calls,
+            'avg_wall_ms': round(wall_ms / calls, 3),
+            'avg_cpu_ms': round(cpu_ms / calls, 3),
+            'avg_statements': round(statements / calls, 1),
+            'cpu_share': round(cpu_share, 2),
+            'bound': 'compute' if cpu_share >= 0.5 else 'io'
+        })
+    summary.sort(key=lambda entry: entry['avg_wall_ms'], reverse=True)
+    
+    return {'enabled': SQL_PROFILE, 'functions': summary}
+
+
 def init_database():
     """Initialize both healthcare and user databases"""
     print("Initializing databases...")
@@ -148,6 +330,9 @@ def init_user_database():
         
         # Verify the schema was created correctly
         verify_user_database_schema(conn)
+
+        # Index lookup columns (after verification has added any missing ones)
+        create_user_indexes(conn)
         
         conn.commit()
         print(f"User database initialized successfully: {USER_DATABASE}")
@@ -232,6 +417,7 @@ def create_user_tables(conn):
             expected_result_count INTEGER,
             expected_result_sample TEXT, -- JSON sample of expected results
             hints TEXT, -- JSON array of progressive hints
+            hints_count INTEGER DEFAULT 0, -- length of the hints array
             max_score INTEGER DEFAULT 100,
             time_limit_minutes INTEGER DEFAULT 30,
             admin_sql_example TEXT, -- Internal SQL examples (admin only)
@@ -331,6 +517,53 @@ def create_user_tables(conn):
     ''')
 
 
+def create_user_indexes(conn):
+    """Create indexes for the user database's frequent lookups.
+    
+    Columns declared UNIQUE (invitation_token, candidate_invitations.email,
+    username, session_token, user_challenge_progress (user_id, challenge_id))
+    are already indexed by SQLite.
+    """
+    print("Creating user database indexes...")
+    
+    # Candidate login finds the user by email
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
+    
+    # Invitation list pages walk invitations newest first
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ci_created
+        ON candidate_invitations (created_at DESC, id DESC)
+    ''')
+    
+    # Activity log lookups by user or invitation, newest first
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cal_user_ts
+        ON candidate_activity_log (user_id, timestamp DESC)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cal_token_ts
+        ON candidate_activity_log (invitation_token, timestamp DESC)
+    ''')
+    
+    # Impersonation sessions are looked up by the admin who started them
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sessions_impersonated_by
+        ON user_sessions (impersonated_by)
+    ''')
+    
+    # Active challenges in display order, so listings skip archived rows and the sort
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_active_challenges
+        ON challenges (difficulty_level, id) WHERE is_active = 1
+    ''')
+    
+    # A user's latest attempts at one challenge, read straight off the index
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attempts_user_chal_date
+        ON challenge_attempts (user_id, challenge_id, created_at DESC)
+    ''')
+
+
 def verify_user_database_schema(conn):
     """Verify that all required columns exist in user tables"""
     print("Verifying user database schema...")
@@ -382,6 +615,16 @@ def verify_user_database_schema(conn):
         if 'admin_notes' not in challenges_columns:
             conn.execute("ALTER TABLE challenges ADD COLUMN admin_notes TEXT")
             print("Added admin_notes column to challenges table")
+        
+        if 'hints_count' not in challenges_columns:
+            conn.execute("ALTER TABLE challenges ADD COLUMN hints_count INTEGER DEFAULT 0")
+            conn.execute('''
+                UPDATE challenges SET hints_count = CASE
+                    WHEN json_valid(hints) AND json_type(hints) = 'array' THEN json_array_length(hints)
+                    ELSE 0
+                END
+            ''')
+            print("Added hints_count column to challenges table")
             
         conn.commit()
         print("Challenges table schema updated with admin columns")
@@ -110,12 +110,4 @@ CREATE TABLE invoice_details (
     FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
 );
 
--- Create indexes for better query performance
-CREATE INDEX idx_invoices_patient_id ON invoices(patient_id);
-CREATE INDEX idx_invoices_service_line ON invoices(service_line_code);
-CREATE INDEX idx_invoices_ar_status ON invoices(ar_status);
-CREATE INDEX idx_invoices_service_dates ON invoices(service_start_date, service_end_date);
-CREATE INDEX idx_invoice_details_invoice_id ON invoice_details(invoice_id);
-CREATE INDEX idx_invoice_details_patient_id ON invoice_details(patient_id);
-CREATE INDEX idx_invoice_details_cpt_code ON invoice_details(cpt_code);
-CREATE INDEX idx_invoice_details_service_dates ON invoice_details(service_start_date, service_end_date);
\ No newline at end of file
+-- Indexes live in schema_indexes.sql and are created after the bulk load
@@ -182,5 +182,83 @@ def test_quiz_questions_file_exists():
     assert len(questions) > 0
 
 
+@pytest.fixture
+def user_db(tmp_path, monkeypatch):
+    """Point the user database, and its connection pool, at a fresh temporary file"""
+    import models.database as database
+    
+    monkeypatch.setattr(database, 'USER_DATABASE', str(tmp_path / 'user_data.db'))
+    monkeypatch.setattr(database, '_user_db_pool', None)
+    monkeypatch.setattr(database, '_user_db_writer', None)
+    monkeypatch.setattr(database, '_user_db_pool_pid', None)
+    
+    conn = database.get_user_db_connection()
+    database.create_user_tables(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def admin_invitations(client, user_db, monkeypatch):
+    """Admin-authenticated client over a user database holding three invitations"""
+    import models.admin_auth as admin_auth
+    
+    monkeypatch.setattr(admin_auth, 'get_admin_by_session',
+                        lambda token: {'id': 1, 'username': 'admin', 'email': 'admin@example.com'})
+    
+    conn = user_db
+    conn.execute("INSERT INTO users (id, username, email, is_admin) VALUES (1, 'admin', 'admin@example.com', 1)")
+    for i in range(3):
+        conn.execute('''
+            INSERT INTO candidate_invitations (email, candidate_name, invitation_token, created_by, created_at)
+            VALUES (?, ?, ?, 1, '2024-01-01 00:00:00')
+        ''', (f'candidate{i}@example.com', f'Candidate {i}', f'token{i}'))
+    conn.commit()
+    
+    with client.session_transaction() as sess:
+        sess['admin_session_token'] = 'test-token'
+    return client
+
+
+def test_api_candidate_invitations_paging(admin_invitations):
+    """Test invitation paging clamps the limit and follows the cursor"""
+    response = admin_invitations.get('/api/admin/candidates/invitations?limit=0')
+    assert response.status_code == 200
+    assert len(json.loads(response.data)['invitations']) == 1
+    
+    response = admin_invitations.get('/api/admin/candidates/invitations?limit=2')
+    first_page = json.loads(response.data)
+    assert [i['id'] for i in first_page['invitations']] == [3, 2]
+    assert first_page['next_cursor'] == {'before_created_at': '2024-01-01 00:00:00', 'before_id': 2}
+    
+    response = admin_invitations.get('/api/admin/candidates/invitations', query_string={
+        'limit': 2, **first_page['next_cursor']})
+    second_page = json.loads(response.data)
+    assert [i['id'] for i in second_page['invitations']] == [1]
+    assert second_page['next_cursor'] is None
+
+
+def test_record_challenge_attempt_keeps_best_progress(user_db):
+    """Test a later, worse attempt keeps the best score and completion"""
+    from models.challenges import record_challenge_attempt
+    
+    user_db.execute("INSERT INTO users (id, username) VALUES (1, 'candidate')")
+    user_db.execute('''
+        INSERT INTO challenges (id, title, description, difficulty_level, category)
+        VALUES (1, 'Test', 'Test challenge', 1, 'data-integrity')
+    ''')
+    user_db.commit()
+    
+    assert record_challenge_attempt(1, 1, 'SELECT 1', 1, True, 90, 0, 5.0)
+    assert record_challenge_attempt(1, 1, 'SELECT 2', 1, False, 20, 1, 5.0)
+    
+    progress = user_db.execute('''
+        SELECT best_score, total_attempts, is_completed
+        FROM user_challenge_progress WHERE user_id = 1 AND challenge_id = 1
+    ''').fetchone()
+    assert tuple(progress) == (90, 2, 1)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
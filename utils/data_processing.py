@@ -115,40 +115,40 @@ def is_date_column(column_name):
 
 def determine_column_type(sample_rows, column_name):
     """Determine the best SQLite type for a column based on sample data"""
-    values = []
-    for row in sample_rows:
-        if column_name in row and row[column_name] is not None:
-            values.append(row[column_name])
-    
-    if len(values) == 0:
-        return 'TEXT'
-    
-    # Check if it's a date column
+    # Date and money columns are decided by name, as soon as any value is present
     if is_date_column(column_name):
-        return 'TEXT'  # Store dates as TEXT in ISO format
-    
-    # Check if it's a money column
-    if is_money_column(column_name):
-        return 'INTEGER'  # Store money as cents (integer)
+        named_type = 'TEXT'  # Store dates as TEXT in ISO format
+    elif is_money_column(column_name):
+        named_type = 'INTEGER'  # Store money as cents (integer)
+    else:
+        named_type = None
     
-    # Analyze numeric patterns
+    # Analyze numeric patterns in a single pass, stopping at the first non-numeric value
+    total_count = 0
     int_count = 0
     float_count = 0
     
-    for value in values:
+    for row in sample_rows:
+        value = row.get(column_name)
+        if value is None:
+            continue
+        if named_type:
+            return named_type
+        
+        total_count += 1
         try:
-            int_val = int(float(value))
-            if float(value) == int_val:
+            float_val = float(value)
+            if float_val == int(float_val):
                 int_count += 1
             else:
                 float_count += 1
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, OverflowError):
             # Not numeric
             return 'TEXT'
     
     # If more than 80% are numeric
     total_numeric = int_count + float_count
-    if total_numeric > 0 and total_numeric / len(values) > 0.8:
+    if total_numeric > 0 and total_numeric / total_count > 0.8:
         # If all numeric values are integers, use INTEGER type
         if float_count == 0:
             return 'INTEGER'
@@ -303,19 +303,23 @@ def process_single_csv(file_obj, filename):
             csv_reader = csv.DictReader(io.StringIO(content))
             insert_sql = f'INSERT INTO {table_name} ({", ".join([f"`{name}`" for name in cleaned_fieldnames])}) VALUES ({", ".join(["?" for _ in cleaned_fieldnames])})'
             
+            # Conversions depend only on the column, so decide them once instead of per row
+            money_flags = [column_types[name] == 'INTEGER' and is_money_column(name) for name in cleaned_fieldnames]
+            real_flags = [column_types[name] == 'REAL' for name in cleaned_fieldnames]
+            date_flags = [is_date_column(name) for name in cleaned_fieldnames]
+            
             row_count = 0
             for row in csv_reader:
                 values = []
-                for old_name, new_name in zip(csv_reader.fieldnames, cleaned_fieldnames):
+                for i, old_name in enumerate(csv_reader.fieldnames):
                     value = clean_value(row[old_name])
                     
-                    # Process based on cached column type (MUCH faster)
-                    col_type = column_types[new_name]
-                    if col_type == 'INTEGER' and is_money_column(new_name):
+                    # Process based on cached column flags
+                    if money_flags[i]:
                         value = parse_money_to_cents(value) if value else None
-                    elif col_type == 'REAL':
+                    elif real_flags[i]:
                         value = parse_decimal(value) if value else None
-                    elif is_date_column(new_name) and value:
+                    elif date_flags[i] and value:
                         # Convert date to ISO format
                         date_obj = parse_date(value)
                         value = date_obj.isoformat() if date_obj else value